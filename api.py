@@ -1,40 +1,160 @@
 """
 FastAPI endpoints for Care-Sync Application
 """
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Form, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, update, func, and_, tuple_, cast, Integer
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from datetime import datetime, date, timedelta, timezone
+from dateutil.relativedelta import relativedelta
 import os
-import json
-from pydantic import BaseModel
-
-from database import get_db, User, HealthRecord, Appointment, RecordAccess, AccessLog, HealthMetric
+import time
+import asyncio
+import hashlib
+import threading
+import aiofiles
+import orjson
+import numpy as np
+import pyarrow as pa
+from cachetools import TLRUCache, TTLCache
+from pydantic import BaseModel, ConfigDict
+
+from database import get_db, get_async_sessionmaker, User, HealthRecord, Appointment, RecordAccess, AccessLog, HealthMetric, RecordsSummary
 from utils import (
-    verify_password, get_password_hash, create_access_token, verify_token,
-    encrypt_file, extract_metadata_from_file, validate_file_upload,
+    verify_password_cached, get_password_hash, create_access_token, verify_token,
+    encrypt_file, extract_metadata_from_file, validate_file_upload, file_type_error, flag_critical_values,
     analyze_health_metrics
 )
-from config import UPLOAD_DIR, MAX_FILE_SIZE, UserRole, RecordType, AppointmentStatus
+from config import (
+    UPLOAD_DIR, MAX_FILE_SIZE, UPLOAD_CHUNK_SIZE, TOKEN_CACHE_TTL, USER_CACHE_TTL,
+    MAX_AUDIT_LOG_LIMIT,
+    UserRole, RoleMask, RecordType, AppointmentStatus
+)
+
+class ORJSONResponse(JSONResponse):
+    """JSON response serialized with orjson instead of the stdlib encoder"""
 
-app = FastAPI(title="Care-Sync API", version="1.0.0")
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Encryption and metadata extraction are CPU/disk bound; run them off the
+    # event loop. Threads rather than processes so every worker shares the
+    # in-process Fernet key.
+    app.state.file_pool = ThreadPoolExecutor(thread_name_prefix="care-sync-files")
+    # bcrypt is CPU bound and releases the GIL, so size its pool to the CPUs
+    app.state.hash_pool = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="care-sync-hash")
+    try:
+        yield
+    finally:
+        app.state.file_pool.shutdown(wait=True)
+        app.state.hash_pool.shutdown(wait=True)
+
+app = FastAPI(
+    title="Care-Sync API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
 security = HTTPBearer()
 
+# Authentication caches. Tokens are keyed by a SHA-256 digest so raw bearer
+# tokens are never kept in memory; entries never outlive the token's "exp".
+_token_cache = TLRUCache(
+    maxsize=10_000,
+    ttu=lambda _key, value, now: min(value[1], now + TOKEN_CACHE_TTL),
+    timer=time.time
+)
+_user_cache = TTLCache(maxsize=5_000, ttl=USER_CACHE_TTL)
+_auth_cache_lock = threading.Lock()
+
 # Helper functions
-def calculate_age(birth_date):
-    """Calculate age from birth date, handling timezone issues"""
-    try:
-        today = datetime.now()
-        # Handle timezone-aware dates
-        if birth_date.tzinfo is not None:
-            birth_date = birth_date.replace(tzinfo=None)
-        return (today - birth_date).days // 365
-    except:
-        return None
+def age_in_years(birth_date):
+    """SQL expression for completed years of age (SQLite date functions)"""
+    years = cast(func.strftime("%Y", "now"), Integer) - cast(func.strftime("%Y", birth_date), Integer)
+    before_birthday = func.strftime("%m-%d", "now") < func.strftime("%m-%d", birth_date)
+    return years - cast(before_birthday, Integer)
+
+def count_subquery(model, *criteria):
+    """Build a scalar COUNT(*) subquery so several counts share one statement"""
+    return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+async def ndjson_rows(query):
+    """Yield query rows as NDJSON lines, streamed from the database.
+
+    Opens its own session so the stream outlives the request's dependencies.
+    """
+    async with get_async_sessionmaker()() as db:
+        result = await db.stream(query)
+        async for row in result:
+            yield orjson.dumps(dict(row._mapping)) + b"\n"
+
+# All system counts in a single round trip; built once at import so each
+# request reuses the same statement (and its compiled-SQL cache entry)
+SYSTEM_STATISTICS_QUERY = select(
+    count_subquery(User).label("total_users"),
+    count_subquery(User, User.role == UserRole.PATIENT).label("total_patients"),
+    count_subquery(User, User.role == UserRole.DOCTOR).label("total_doctors"),
+    count_subquery(HealthRecord).label("total_records"),
+    count_subquery(Appointment).label("total_appointments"),
+    count_subquery(HealthMetric).label("total_metrics")
+)
+
+# Columns the admin list endpoints may return via ``fields``, and their defaults
+USER_FIELDS = {name: getattr(User, name) for name in (
+    "id", "username", "email", "role", "full_name", "is_active", "created_at", "phone", "gender"
+)}
+DEFAULT_USER_FIELDS = ("id", "username", "email", "role", "full_name", "is_active", "created_at")
+AUDIT_LOG_FIELDS = {name: getattr(AccessLog, name) for name in (
+    "id", "user_id", "record_id", "action", "timestamp", "ip_address", "user_agent"
+)}
+DEFAULT_AUDIT_LOG_FIELDS = ("id", "user_id", "record_id", "action", "timestamp", "ip_address")
+
+def selected_columns(fields: Optional[str], allowed: dict, default: tuple) -> list:
+    """Resolve a comma-separated ``fields`` parameter against a column whitelist"""
+    names = [name.strip() for name in fields.split(",") if name.strip()] if fields else default
+    unknown = [name for name in names if name not in allowed]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}" if unknown else "No fields requested"
+        )
+    return [allowed[name] for name in names]
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+def arrow_response(result, dictionary_columns=()) -> Response:
+    """Serialize a query result as an Arrow IPC stream.
+
+    Low-cardinality columns listed in ``dictionary_columns`` are dictionary
+    encoded so pandas clients receive them as categoricals.
+    """
+    columns = list(result.keys())
+    rows = result.all()
+    table = pa.table({name: [row[i] for row in rows] for i, name in enumerate(columns)})
+    for name in dictionary_columns:
+        if name not in columns:
+            continue
+        table = table.set_column(
+            table.schema.get_field_index(name), name, table[name].dictionary_encode()
+        )
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(sink.getvalue().to_pybytes(), media_type=ARROW_STREAM_MEDIA_TYPE)
 
 # Pydantic models for API
 class UserCreate(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     username: str
     email: str
     password: str
@@ -46,10 +166,14 @@ class UserCreate(BaseModel):
     address: Optional[str] = None
 
 class UserLogin(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     username: str
     password: str
 
 class AppointmentCreate(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     patient_id: int
     doctor_id: int
     appointment_date: datetime
@@ -57,89 +181,166 @@ class AppointmentCreate(BaseModel):
     reason: Optional[str] = None
 
 class RecordAccessGrant(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     record_id: int
     doctor_id: int
     expires_at: Optional[datetime] = None
 
 class HealthMetricCreate(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     metric_name: str
     value: float
     unit: Optional[str] = None
     recorded_at: datetime
     notes: Optional[str] = None
 
+class AppointmentStatusUpdate(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+    id: int
+    status: str
+
+class AppointmentBulkUpdate(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+    updates: List[AppointmentStatusUpdate]
+
+# Response models
+class RecordOut(BaseModel):
+    id: int
+    record_type: str
+    title: str
+    description: Optional[str] = None
+    file_name: Optional[str] = None
+    record_date: datetime
+    date_created: Optional[datetime] = None
+
+class RecordList(BaseModel):
+    records: List[RecordOut]
+
+class AppointmentOut(BaseModel):
+    id: int
+    patient_id: int
+    doctor_id: int
+    appointment_date: datetime
+    duration_minutes: Optional[int] = None
+    status: Optional[str] = None
+    reason: Optional[str] = None
+    notes: Optional[str] = None
+
+class AppointmentList(BaseModel):
+    appointments: List[AppointmentOut]
+
 # Authentication dependency
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_db)):
     """Get current authenticated user"""
     token = credentials.credentials
-    payload = verify_token(token)
+    token_key = hashlib.sha256(token.encode()).digest()[:16]
+
+    with _auth_cache_lock:
+        cached = _token_cache.get(token_key)
+
+    if cached is None:
+        payload = verify_token(token)
+
+        if payload is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid authentication credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        username: str = payload.get("sub")
+        if username is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid authentication credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        # Only valid tokens are cached, and never past their expiry
+        with _auth_cache_lock:
+            _token_cache[token_key] = (username, payload.get("exp", 0))
+    else:
+        username = cached[0]
 
-    if payload is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    with _auth_cache_lock:
+        user = _user_cache.get(username)
 
-    username: str = payload.get("sub")
-    if username is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    user = db.query(User).filter(User.username == username).first()
     if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        result = await db.execute(select(User).where(User.username == username))
+        user = result.scalar_one_or_none()
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        # Detach before caching so a rollback or expire in this request's
+        # session cannot leave an expired instance in the shared cache
+        db.expunge(user)
+        with _auth_cache_lock:
+            _user_cache[username] = user
 
     return user
 
+# Liveness endpoint, polled by the startup scripts before launching Streamlit
+@app.get("/health")
+async def health_check():
+    """Report that the API is accepting requests"""
+    return {"status": "ok"}
+
 # Authentication endpoints
 @app.post("/auth/register")
-def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user"""
-    # Check if user already exists
-    existing_user = db.query(User).filter(
-        (User.username == user_data.username) | (User.email == user_data.email)
-    ).first()
+    # A single insert that yields no row when the username or email is taken
+    hashed_password = await asyncio.get_running_loop().run_in_executor(
+        app.state.hash_pool, get_password_hash, user_data.password
+    )
+    result = await db.execute(
+        sqlite_insert(User)
+        .values(
+            username=user_data.username,
+            email=user_data.email,
+            hashed_password=hashed_password,
+            role=user_data.role,
+            full_name=user_data.full_name,
+            phone=user_data.phone,
+            date_of_birth=user_data.date_of_birth,
+            gender=user_data.gender,
+            address=user_data.address
+        )
+        .on_conflict_do_nothing()
+        .returning(User.id)
+    )
+    user_id = result.scalar_one_or_none()
 
-    if existing_user:
+    if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username or email already registered"
         )
 
-    # Create new user
-    hashed_password = get_password_hash(user_data.password)
-    db_user = User(
-        username=user_data.username,
-        email=user_data.email,
-        hashed_password=hashed_password,
-        role=user_data.role,
-        full_name=user_data.full_name,
-        phone=user_data.phone,
-        date_of_birth=user_data.date_of_birth,
-        gender=user_data.gender,
-        address=user_data.address
-    )
-
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
 
-    return {"message": "User registered successfully", "user_id": db_user.id}
+    return {"message": "User registered successfully", "user_id": user_id}
 
 @app.post("/auth/login")
-def login_user(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login_user(user_credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     """Authenticate user and return access token"""
-    user = db.query(User).filter(User.username == user_credentials.username).first()
+    result = await db.execute(select(User).where(User.username == user_credentials.username))
+    user = result.scalar_one_or_none()
+
+    password_ok = user is not None and await asyncio.get_running_loop().run_in_executor(
+        app.state.hash_pool, verify_password_cached,
+        user.username, user_credentials.password, user.hashed_password
+    )
 
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -169,27 +370,42 @@ async def upload_health_record(
     description: str = Form(None),
     record_date: str = Form(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Upload a health record"""
-    if current_user.role != UserRole.PATIENT:
+    if not current_user.role_mask & RoleMask.PATIENT:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only patients can upload health records"
         )
 
+    # Reject disallowed types before any of the body is written to disk
+    type_error = file_type_error(file.filename)
+    if type_error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File validation failed: {type_error}"
+        )
+
     # Create upload directory for user
     user_upload_dir = UPLOAD_DIR / str(current_user.id)
     user_upload_dir.mkdir(exist_ok=True)
 
-    # Save uploaded file
+    # Stream uploaded file to disk, hashing it as it arrives
     file_path = user_upload_dir / file.filename
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
-
-    # Validate file
-    validation_result = validate_file_upload(str(file_path), MAX_FILE_SIZE)
+    sha256_hash = hashlib.sha256()
+    bytes_written = 0
+    async with aiofiles.open(file_path, "wb") as buffer:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            sha256_hash.update(chunk)
+            await buffer.write(chunk)
+            bytes_written += len(chunk)
+            # Stop early on oversized uploads; validation below rejects them
+            if bytes_written > MAX_FILE_SIZE:
+                break
+
+    # Validate file; the byte count from streaming it stands in for a stat
+    validation_result = validate_file_upload(str(file_path), MAX_FILE_SIZE, file_size=bytes_written)
     if not validation_result["valid"]:
         os.remove(file_path)
         raise HTTPException(
@@ -198,10 +414,15 @@ async def upload_health_record(
         )
 
     # Extract metadata
-    metadata = extract_metadata_from_file(str(file_path))
+    loop = asyncio.get_running_loop()
+    metadata = await loop.run_in_executor(
+        app.state.file_pool,
+        partial(extract_metadata_from_file, str(file_path),
+                checksum=sha256_hash.hexdigest(), file_size=bytes_written)
+    )
 
     # Encrypt file
-    encrypted_path = encrypt_file(str(file_path))
+    encrypted_path = await loop.run_in_executor(app.state.file_pool, encrypt_file, str(file_path))
 
     # Save record to database
     db_record = HealthRecord(
@@ -212,130 +433,146 @@ async def upload_health_record(
         file_path=encrypted_path,
         file_name=file.filename,
         file_size=metadata["file_size"],
-        record_metadata=json.dumps(metadata),
+        record_metadata=metadata,
         record_date=datetime.fromisoformat(record_date)
     )
 
     db.add(db_record)
-    db.commit()
-    db.refresh(db_record)
+    await db.flush()  # assigns db_record.id without ending the transaction
 
-    # Log access
+    # Log access in the same transaction
     log_entry = AccessLog(
         user_id=current_user.id,
         record_id=db_record.id,
         action="upload"
     )
     db.add(log_entry)
-    db.commit()
+    await db.commit()
 
     return {"message": "Health record uploaded successfully", "record_id": db_record.id}
 
-@app.get("/records/my-records")
-def get_my_records(
+@app.get("/records/my-records", response_model=RecordList)
+async def get_my_records(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get current user's health records"""
-    if current_user.role != UserRole.PATIENT:
+    if not current_user.role_mask & RoleMask.PATIENT:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only patients can view their own records"
         )
 
-    records = db.query(HealthRecord).filter(HealthRecord.patient_id == current_user.id).all()
+    result = await db.execute(
+        select(
+            HealthRecord.id, HealthRecord.record_type, HealthRecord.title,
+            HealthRecord.description, HealthRecord.file_name,
+            HealthRecord.record_date, HealthRecord.date_created
+        ).where(HealthRecord.patient_id == current_user.id)
+    )
 
-    return {
-        "records": [
-            {
-                "id": record.id,
-                "record_type": record.record_type,
-                "title": record.title,
-                "description": record.description,
-                "file_name": record.file_name,
-                "record_date": record.record_date,
-                "date_created": record.date_created
-            }
-            for record in records
-        ]
-    }
+    return {"records": [dict(row._mapping) for row in result]}
 
 @app.post("/records/grant-access")
-def grant_record_access(
+async def grant_record_access(
     access_data: RecordAccessGrant,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Grant access to a health record to a doctor"""
-    if current_user.role != UserRole.PATIENT:
+    if not current_user.role_mask & RoleMask.PATIENT:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only patients can grant access to their records"
         )
 
-    # Verify record belongs to current user
-    record = db.query(HealthRecord).filter(
-        HealthRecord.id == access_data.record_id,
-        HealthRecord.patient_id == current_user.id
-    ).first()
+    # Verify record ownership and doctor existence in one query; the outer
+    # join keeps the record row so each failure gets its own error
+    result = await db.execute(
+        select(HealthRecord.id, User.id.label("doctor_id"))
+        .outerjoin(User, and_(
+            User.id == access_data.doctor_id,
+            User.role == UserRole.DOCTOR
+        ))
+        .where(
+            HealthRecord.id == access_data.record_id,
+            HealthRecord.patient_id == current_user.id
+        )
+    )
+    row = result.first()
 
-    if not record:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Health record not found"
         )
 
-    # Verify doctor exists
-    doctor = db.query(User).filter(
-        User.id == access_data.doctor_id,
-        User.role == UserRole.DOCTOR
-    ).first()
-
-    if not doctor:
+    if row.doctor_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Doctor not found"
         )
 
     # Create access permission
-    access_permission = RecordAccess(
-        record_id=access_data.record_id,
-        doctor_id=access_data.doctor_id,
-        granted_by=current_user.id,
-        expires_at=access_data.expires_at
+    await db.execute(
+        insert(RecordAccess).values(
+            record_id=access_data.record_id,
+            doctor_id=access_data.doctor_id,
+            granted_by=current_user.id,
+            expires_at=access_data.expires_at
+        )
     )
-
-    db.add(access_permission)
-    db.commit()
+    await db.commit()
 
     return {"message": "Access granted successfully"}
 
+@app.get("/records/active-doctors")
+async def get_active_doctor_count(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Count doctors with active access to the current user's records"""
+    if not current_user.role_mask & RoleMask.PATIENT:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only patients can view who has access to their records"
+        )
+
+    result = await db.execute(
+        select(func.count(func.distinct(RecordAccess.doctor_id)))
+        .join(HealthRecord)
+        .where(
+            HealthRecord.patient_id == current_user.id,
+            RecordAccess.is_active == True
+        )
+    )
+
+    return {"active_doctors": result.scalar_one()}
+
 # Appointment endpoints
 @app.post("/appointments/create")
-def create_appointment(
+async def create_appointment(
     appointment_data: AppointmentCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new appointment"""
-    if current_user.role not in [UserRole.DOCTOR, UserRole.PATIENT]:
+    if not current_user.role_mask & RoleMask.CLINICAL:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only doctors and patients can create appointments"
         )
 
-    # Verify patient and doctor exist
-    patient = db.query(User).filter(
-        User.id == appointment_data.patient_id,
-        User.role == UserRole.PATIENT
-    ).first()
-
-    doctor = db.query(User).filter(
-        User.id == appointment_data.doctor_id,
-        User.role == UserRole.DOCTOR
-    ).first()
+    # Verify patient and doctor exist in one query
+    result = await db.execute(
+        select(User.id, User.role).where(
+            User.id.in_([appointment_data.patient_id, appointment_data.doctor_id])
+        )
+    )
+    roles = {row.id: row.role for row in result}
 
-    if not patient or not doctor:
+    if (roles.get(appointment_data.patient_id) != UserRole.PATIENT
+            or roles.get(appointment_data.doctor_id) != UserRole.DOCTOR):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Patient or doctor not found"
@@ -352,119 +589,111 @@ def create_appointment(
     )
 
     db.add(db_appointment)
-    db.commit()
-    db.refresh(db_appointment)
+    await db.commit()
 
     return {"message": "Appointment created successfully", "appointment_id": db_appointment.id}
 
-@app.get("/appointments/my-appointments")
-def get_my_appointments(
+@app.get("/appointments/my-appointments", response_model=AppointmentList)
+async def get_my_appointments(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get current user's appointments"""
-    if current_user.role == UserRole.PATIENT:
-        appointments = db.query(Appointment).filter(Appointment.patient_id == current_user.id).all()
-    elif current_user.role == UserRole.DOCTOR:
-        appointments = db.query(Appointment).filter(Appointment.doctor_id == current_user.id).all()
+    query = select(
+        Appointment.id, Appointment.patient_id, Appointment.doctor_id,
+        Appointment.appointment_date, Appointment.duration_minutes,
+        Appointment.status, Appointment.reason, Appointment.notes
+    )
+
+    if current_user.role_mask & RoleMask.PATIENT:
+        result = await db.execute(query.where(Appointment.patient_id == current_user.id))
+    elif current_user.role_mask & RoleMask.DOCTOR:
+        result = await db.execute(query.where(Appointment.doctor_id == current_user.id))
     else:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only patients and doctors can view appointments"
         )
 
-    return {
-        "appointments": [
-            {
-                "id": apt.id,
-                "patient_id": apt.patient_id,
-                "doctor_id": apt.doctor_id,
-                "appointment_date": apt.appointment_date,
-                "duration_minutes": apt.duration_minutes,
-                "status": apt.status,
-                "reason": apt.reason,
-                "notes": apt.notes
-            }
-            for apt in appointments
-        ]
-    }
+    return {"appointments": [dict(row._mapping) for row in result]}
 
 # Doctor search and patient management endpoints
 @app.get("/doctors/search-patients")
-def search_patients(
+async def search_patients(
     condition: Optional[str] = None,
     age_min: Optional[int] = None,
     age_max: Optional[int] = None,
     gender: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Search patients based on criteria (for doctors)"""
-    if current_user.role != UserRole.DOCTOR:
+    if not current_user.role_mask & RoleMask.DOCTOR:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only doctors can search patients"
         )
 
-    query = db.query(User).filter(User.role == UserRole.PATIENT)
+    query = select(
+        User.id, User.full_name,
+        age_in_years(User.date_of_birth).label("age"),
+        User.gender, User.phone
+    ).where(User.role == UserRole.PATIENT)
 
     if gender:
-        query = query.filter(User.gender == gender)
+        query = query.where(User.gender == gender)
 
     if age_min or age_max:
-        today = datetime.now()
+        # Exact calendar bounds on date_of_birth, computed once per request
+        today = datetime.combine(date.today(), datetime.min.time())
         if age_max:
-            min_birth_date = today - timedelta(days=age_max * 365)
-            query = query.filter(User.date_of_birth >= min_birth_date)
+            min_birth_date = today - relativedelta(years=age_max + 1)
+            query = query.where(User.date_of_birth > min_birth_date)
         if age_min:
-            max_birth_date = today - timedelta(days=age_min * 365)
-            query = query.filter(User.date_of_birth <= max_birth_date)
+            max_birth_date = today - relativedelta(years=age_min)
+            query = query.where(User.date_of_birth <= max_birth_date)
 
-    patients = query.all()
+    result = await db.execute(query)
 
-    return {
-        "patients": [
-            {
-                "id": patient.id,
-                "full_name": patient.full_name,
-                "age": calculate_age(patient.date_of_birth) if patient.date_of_birth else None,
-                "gender": patient.gender,
-                "phone": patient.phone
-            }
-            for patient in patients
-        ]
-    }
+    return {"patients": [dict(row._mapping) for row in result]}
 
 @app.get("/doctors/patient-records/{patient_id}")
-def get_patient_records(
+async def get_patient_records(
     patient_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get patient records that doctor has access to"""
-    if current_user.role != UserRole.DOCTOR:
+    if not current_user.role_mask & RoleMask.DOCTOR:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only doctors can view patient records"
         )
 
     # Get records that doctor has access to
-    accessible_records = db.query(HealthRecord).join(RecordAccess).filter(
-        RecordAccess.doctor_id == current_user.id,
-        RecordAccess.is_active == True,
-        HealthRecord.patient_id == patient_id
-    ).all()
-
-    # Log access
-    for record in accessible_records:
-        log_entry = AccessLog(
-            user_id=current_user.id,
-            record_id=record.id,
-            action="view"
+    result = await db.execute(
+        select(
+            HealthRecord.id, HealthRecord.record_type, HealthRecord.title,
+            HealthRecord.description, HealthRecord.record_date,
+            HealthRecord.file_size,
+            # Extract just the file type in SQL rather than decoding the whole
+            # metadata blob (which can carry extracted PDF text) per row
+            HealthRecord.record_metadata["file_type"].as_string().label("file_type")
+        ).join(RecordAccess).where(
+            RecordAccess.doctor_id == current_user.id,
+            RecordAccess.is_active == True,
+            HealthRecord.patient_id == patient_id
         )
-        db.add(log_entry)
+    )
+    accessible_records = result.all()
 
-    db.commit()
+    # Log access with a single multi-row INSERT
+    if accessible_records:
+        await db.execute(insert(AccessLog), [
+            {"user_id": current_user.id, "record_id": record.id, "action": "view"}
+            for record in accessible_records
+        ])
+        await db.commit()
 
     return {
         "records": [
@@ -474,7 +703,7 @@ def get_patient_records(
                 "title": record.title,
                 "description": record.description,
                 "record_date": record.record_date,
-                "metadata": json.loads(record.record_metadata) if record.record_metadata else {}
+                "metadata": {"file_size": record.file_size, "file_type": record.file_type}
             }
             for record in accessible_records
         ]
@@ -482,13 +711,13 @@ def get_patient_records(
 
 # Health metrics endpoints
 @app.post("/health-metrics/add")
-def add_health_metric(
+async def add_health_metric(
     metric_data: HealthMetricCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Add a health metric"""
-    if current_user.role != UserRole.PATIENT:
+    if not current_user.role_mask & RoleMask.PATIENT:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only patients can add health metrics"
@@ -500,59 +729,89 @@ def add_health_metric(
         value=metric_data.value,
         unit=metric_data.unit,
         recorded_at=metric_data.recorded_at,
+        is_critical=bool(flag_critical_values([metric_data.metric_name], [metric_data.value])[0]),
         notes=metric_data.notes
     )
 
     db.add(db_metric)
-    db.commit()
+    await db.commit()
 
-    return {"message": "Health metric added successfully"}
+    return {"message": "Health metric added successfully", "is_critical": db_metric.is_critical}
 
 @app.get("/health-metrics/analysis")
-def get_health_analysis(
+async def get_health_analysis(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get health metrics analysis"""
-    if current_user.role != UserRole.PATIENT:
+    if not current_user.role_mask & RoleMask.PATIENT:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only patients can view their health analysis"
         )
 
-    metrics = db.query(HealthMetric).filter(HealthMetric.patient_id == current_user.id).all()
+    result = await db.execute(
+        select(HealthMetric.metric_name, HealthMetric.value)
+        .where(HealthMetric.patient_id == current_user.id)
+        .order_by(HealthMetric.metric_name, HealthMetric.recorded_at)
+    )
+    rows = result.all()
 
-    metrics_data = [
-        {
-            "metric_name": metric.metric_name,
-            "value": metric.value,
-            "unit": metric.unit,
-            "recorded_at": metric.recorded_at
-        }
-        for metric in metrics
-    ]
+    names = np.array([row.metric_name for row in rows], dtype=object)
+    values = np.fromiter((row.value for row in rows), dtype=np.float64, count=len(rows))
 
-    analysis = analyze_health_metrics(metrics_data)
+    analysis = analyze_health_metrics(names, values)
 
     return {"analysis": analysis}
 
+@app.get("/health-metrics/bundle")
+async def get_health_bundle(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get health metrics analysis together with each metric's history"""
+    if not current_user.role_mask & RoleMask.PATIENT:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only patients can view their health analysis"
+        )
+
+    result = await db.execute(
+        select(HealthMetric.metric_name, HealthMetric.value, HealthMetric.recorded_at)
+        .where(HealthMetric.patient_id == current_user.id)
+        .order_by(HealthMetric.metric_name, HealthMetric.recorded_at)
+    )
+    rows = result.all()
+
+    names = np.array([row.metric_name for row in rows], dtype=object)
+    values = np.fromiter((row.value for row in rows), dtype=np.float64, count=len(rows))
+
+    history = {}
+    for row in rows:
+        history.setdefault(row.metric_name, []).append(
+            {"recorded_at": row.recorded_at, "value": row.value}
+        )
+
+    return {"analysis": analyze_health_metrics(names, values), "history": history}
+
 # Appointment management endpoints
 @app.put("/appointments/{appointment_id}/update")
-def update_appointment_status(
+async def update_appointment_status(
     appointment_id: int,
     update_data: dict,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update appointment status"""
-    if current_user.role not in [UserRole.DOCTOR, UserRole.PATIENT]:
+    if not current_user.role_mask & RoleMask.CLINICAL:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only doctors and patients can update appointments"
         )
 
     # Get appointment
-    appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
+    result = await db.execute(select(Appointment).where(Appointment.id == appointment_id))
+    appointment = result.scalar_one_or_none()
     if not appointment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -560,12 +819,12 @@ def update_appointment_status(
         )
 
     # Check permissions
-    if current_user.role == UserRole.DOCTOR and appointment.doctor_id != current_user.id:
+    if current_user.role_mask & RoleMask.DOCTOR and appointment.doctor_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You can only update your own appointments"
         )
-    elif current_user.role == UserRole.PATIENT and appointment.patient_id != current_user.id:
+    elif current_user.role_mask & RoleMask.PATIENT and appointment.patient_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You can only update your own appointments"
@@ -578,98 +837,185 @@ def update_appointment_status(
         appointment.notes = update_data["notes"]
 
     appointment.updated_at = datetime.now(timezone.utc)
-    db.commit()
+    await db.commit()
 
     return {"message": "Appointment updated successfully"}
 
+@app.post("/appointments/bulk-update")
+async def bulk_update_appointment_status(
+    bulk_data: AppointmentBulkUpdate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Update the status of several appointments in one transaction"""
+    if not current_user.role_mask & RoleMask.CLINICAL:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only doctors and patients can update appointments"
+        )
+
+    # Last write wins per appointment, then one UPDATE per target status
+    statuses = {item.id: item.status for item in bulk_data.updates}
+    ids_by_status = {}
+    for appointment_id, new_status in statuses.items():
+        ids_by_status.setdefault(new_status, []).append(appointment_id)
+
+    owner_column = Appointment.doctor_id if current_user.role_mask & RoleMask.DOCTOR else Appointment.patient_id
+    now = datetime.now(timezone.utc)
+
+    updated = 0
+    for new_status, ids in ids_by_status.items():
+        result = await db.execute(
+            update(Appointment)
+            .where(Appointment.id.in_(ids), owner_column == current_user.id)
+            .values(status=new_status, updated_at=now)
+        )
+        updated += result.rowcount
+
+    # Closing the session rolls the partial update back
+    if updated != len(statuses):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="One or more appointments were not found or are not yours"
+        )
+
+    await db.commit()
+
+    return {"message": "Appointments updated successfully", "updated": updated}
+
 # Admin endpoints
 @app.get("/admin/users")
-def get_all_users(
+async def get_all_users(
+    fields: Optional[str] = None,
+    response_format: str = Query("json", alias="format", pattern="^(json|arrow)$"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get all users (admin only)"""
-    if current_user.role != UserRole.ADMIN:
+    """Get all users (admin only)
+
+    ``fields`` narrows the returned columns; ``format=arrow`` returns an Arrow
+    IPC stream.
+    """
+    if not current_user.role_mask & RoleMask.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin access required"
         )
 
-    users = db.query(User).all()
-    return {
-        "users": [
-            {
-                "id": user.id,
-                "username": user.username,
-                "email": user.email,
-                "role": user.role,
-                "full_name": user.full_name,
-                "is_active": user.is_active,
-                "created_at": user.created_at
-            }
-            for user in users
-        ]
-    }
+    columns = selected_columns(fields, USER_FIELDS, DEFAULT_USER_FIELDS)
+    result = await db.execute(select(*columns).order_by(User.id))
+    if response_format == "arrow":
+        return arrow_response(result, dictionary_columns=("role",))
+    return {"users": [dict(row._mapping) for row in result]}
+
+@app.get("/admin/users/export")
+async def export_users(current_user: User = Depends(get_current_user)):
+    """Export all users as NDJSON (admin only)"""
+    if not current_user.role_mask & RoleMask.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+
+    query = select(*selected_columns(None, USER_FIELDS, DEFAULT_USER_FIELDS)).order_by(User.id)
+    return StreamingResponse(ndjson_rows(query), media_type="application/x-ndjson")
 
 @app.get("/admin/statistics")
-def get_system_statistics(
+async def get_system_statistics(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get system statistics (admin only)"""
-    if current_user.role != UserRole.ADMIN:
+    if not current_user.role_mask & RoleMask.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin access required"
         )
 
-    # Count statistics
-    total_users = db.query(User).count()
-    total_patients = db.query(User).filter(User.role == UserRole.PATIENT).count()
-    total_doctors = db.query(User).filter(User.role == UserRole.DOCTOR).count()
-    total_records = db.query(HealthRecord).count()
-    total_appointments = db.query(Appointment).count()
-    total_metrics = db.query(HealthMetric).count()
+    result = await db.execute(SYSTEM_STATISTICS_QUERY)
 
-    return {
-        "statistics": {
-            "total_users": total_users,
-            "total_patients": total_patients,
-            "total_doctors": total_doctors,
-            "total_records": total_records,
-            "total_appointments": total_appointments,
-            "total_metrics": total_metrics
-        }
-    }
+    return {"statistics": dict(result.one()._mapping)}
+
+@app.get("/admin/records-summary")
+async def get_records_summary(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get pre-aggregated health record counts and sizes (admin only)"""
+    if not current_user.role_mask & RoleMask.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+
+    result = await db.execute(
+        select(
+            RecordsSummary.record_type, RecordsSummary.month_bucket,
+            RecordsSummary.file_type, RecordsSummary.count, RecordsSummary.total_size
+        ).where(RecordsSummary.count > 0)
+    )
+
+    return {"summary": [dict(row._mapping) for row in result]}
 
 @app.get("/admin/audit-logs")
-def get_audit_logs(
+async def get_audit_logs(
     limit: int = 100,
+    before_ts: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    fields: Optional[str] = None,
+    response_format: str = Query("json", alias="format", pattern="^(json|arrow)$"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get audit logs (admin only)"""
-    if current_user.role != UserRole.ADMIN:
+    """Get audit logs, newest first (admin only)
+
+    To fetch the next page, pass both the ``timestamp`` and the ``id`` of the
+    last returned row as ``before_ts`` and ``before_id``; timestamps alone are
+    not unique. Pass ``fields`` to narrow the returned columns (keep ``id`` in
+    them when paging) and ``format=arrow`` to receive an Arrow IPC stream
+    instead of JSON.
+    """
+    if not current_user.role_mask & RoleMask.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin access required"
         )
 
-    logs = db.query(AccessLog).order_by(AccessLog.timestamp.desc()).limit(limit).all()
+    if (before_ts is None) != (before_id is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="before_ts and before_id must be passed together"
+        )
 
-    return {
-        "logs": [
-            {
-                "id": log.id,
-                "user_id": log.user_id,
-                "record_id": log.record_id,
-                "action": log.action,
-                "timestamp": log.timestamp,
-                "ip_address": log.ip_address
-            }
-            for log in logs
-        ]
-    }
+    limit = max(1, min(limit, MAX_AUDIT_LOG_LIMIT))
+    query = select(*selected_columns(fields, AUDIT_LOG_FIELDS, DEFAULT_AUDIT_LOG_FIELDS))
+    if before_ts is not None:
+        query = query.where(tuple_(AccessLog.timestamp, AccessLog.id) < tuple_(before_ts, before_id))
+
+    result = await db.execute(
+        query.order_by(AccessLog.timestamp.desc(), AccessLog.id.desc()).limit(limit)
+    )
+
+    if response_format == "arrow":
+        return arrow_response(result, dictionary_columns=("action", "user_id"))
+    return {"logs": [dict(row._mapping) for row in result]}
+
+@app.get("/admin/audit-logs/export")
+async def export_audit_logs(
+    limit: Optional[int] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Export audit logs as NDJSON, newest first (admin only)"""
+    if not current_user.role_mask & RoleMask.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+
+    query = select(
+        *selected_columns(None, AUDIT_LOG_FIELDS, DEFAULT_AUDIT_LOG_FIELDS)
+    ).order_by(AccessLog.timestamp.desc(), AccessLog.id.desc()).limit(limit)
+    return StreamingResponse(ndjson_rows(query), media_type="application/x-ndjson")
 
 if __name__ == "__main__":
     import uvicorn
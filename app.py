@@ -3,16 +3,59 @@ Main Streamlit application for Care-Sync
 """
 import streamlit as st
 import requests
-import json
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.errors import StreamlitAPIException
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import orjson
+import time
+from datetime import date, datetime
 from typing import Dict, Any, Optional
-import os
+from pathlib import Path
 
 # Configuration
 API_BASE_URL = "http://localhost:8000"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+REQUEST_TIMEOUT = (3, 10)  # (connect, read) seconds
+CIRCUIT_FAILURE_THRESHOLD = 3  # consecutive connection failures before pausing an endpoint
+CIRCUIT_WINDOW_SECONDS = 30
+
+# Form options
+ROLES = ("patient", "doctor", "admin")
+GENDERS = ("", "Male", "Female", "Other")
+RECORD_TYPES = ("Lab Report", "Prescription", "Diagnosis", "Imaging", "Vaccination", "Other")
+METRIC_TYPES = (
+    "blood_pressure_systolic", "blood_pressure_diastolic",
+    "heart_rate", "temperature", "blood_sugar", "weight", "height"
+)
+QUICK_METRIC_TYPES = ("blood_pressure_systolic", "heart_rate", "temperature")
+SPECIALTIES = ("General Practice", "Cardiology", "Dermatology", "Pediatrics", "Other")
+APPOINTMENT_DURATIONS = (30, 45, 60)
+
+# Registration form layout: rows of (field, widget, label, widget kwargs)
+REGISTER_FORM = (
+    (("username", st.text_input, "Username", {}),),
+    (("email", st.text_input, "Email", {}),),
+    (("password", st.text_input, "Password", {"type": "password"}),),
+    (("confirm_password", st.text_input, "Confirm Password", {"type": "password"}),),
+    (("full_name", st.text_input, "Full Name", {}),),
+    (("role", st.selectbox, "Role", {"options": ROLES}),),
+    (("phone", st.text_input, "Phone (optional)", {}),),
+    (
+        ("date_of_birth", st.date_input, "Date of Birth (optional)", {"value": None}),
+        ("gender", st.selectbox, "Gender (optional)", {"options": GENDERS}),
+    ),
+    (("address", st.text_area, "Address (optional)", {}),),
+)
+REGISTER_REQUIRED = ("username", "email", "password", "confirm_password", "full_name")
+
+# Admin audit log page: only the displayed columns are fetched
+AUDIT_LOG_ENDPOINT = "/admin/audit-logs?limit=50&format=arrow&fields=timestamp,user_id,action,record_id,ip_address"
+
+# Patient search results: fixed columns and dtypes so pandas skips inference
+PATIENT_SEARCH_COLUMNS = ["id", "full_name", "age", "gender", "phone"]
+PATIENT_SEARCH_DTYPES = {"id": "int32", "age": "Int16", "gender": "category"}
 
 # Page configuration
 st.set_page_config(
@@ -22,206 +65,13 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Clean Modern Healthcare Theme - FIXED
-st.markdown("""
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
-
-    /* Global App Styling */
-    .stApp {
-        background: #f8fafc;
-        font-family: 'Inter', sans-serif;
-    }
-
-    /* Main Container - Clean and Simple */
-    .main .block-container {
-        background: #ffffff;
-        border-radius: 12px;
-        padding: 2rem;
-        margin: 1rem;
-        box-shadow: 0 4px 20px rgba(0, 0, 0, 0.08);
-        border: 1px solid #e2e8f0;
-        max-width: 1200px;
-    }
-
-    /* Clean Header - NO BLUR, CRYSTAL CLEAR */
-    .main-header {
-        font-family: 'Inter', sans-serif;
-        font-size: 2.5rem;
-        font-weight: 700;
-        text-align: center;
-        margin-bottom: 1.5rem;
-        color: #1a202c;
-        text-shadow: none;
-        filter: none;
-        -webkit-filter: none;
-    }
-
-    /* Clean Card Styling */
-    .dashboard-card, .metric-card {
-        background: #ffffff;
-        border: 1px solid #e2e8f0;
-        border-radius: 8px;
-        padding: 1.5rem;
-        margin-bottom: 1rem;
-        box-shadow: 0 2px 8px rgba(0, 0, 0, 0.04);
-    }
-
-    .metric-card {
-        text-align: center;
-        background: #3182ce;
-        color: white;
-        border: none;
-    }
-
-    /* Clean Simple Buttons */
-    .stButton > button {
-        background: #3182ce;
-        color: white;
-        border: none;
-        border-radius: 6px;
-        padding: 0.5rem 1rem;
-        font-weight: 500;
-        font-size: 0.9rem;
-    }
-
-    .stButton > button:hover {
-        background: #2c5aa0;
-    }
-
-    /* Clean Form Inputs */
-    .stTextInput > div > div > input,
-    .stTextArea > div > div > textarea,
-    .stSelectbox > div > div,
-    .stNumberInput > div > div > input,
-    .stDateInput > div > div > input,
-    .stTimeInput > div > div > input {
-        border-radius: 6px;
-        border: 1px solid #d1d5db;
-        padding: 0.5rem;
-        font-size: 0.9rem;
-        background: white;
-        color: #374151;
-    }
-
-    .stTextInput > div > div > input:focus,
-    .stTextArea > div > div > textarea:focus,
-    .stSelectbox > div > div:focus-within,
-    .stNumberInput > div > div > input:focus,
-    .stDateInput > div > div > input:focus,
-    .stTimeInput > div > div > input:focus {
-        border-color: #3182ce;
-        outline: none;
-        box-shadow: 0 0 0 2px rgba(49, 130, 206, 0.2);
-    }
-
-    /* Clean Sidebar */
-    .css-1d391kg {
-        background: #1f2937;
-    }
-
-    .css-1d391kg .css-1v0mbdj {
-        color: white;
-    }
-
-    /* Clean Messages */
-    .stSuccess {
-        background: #10b981;
-        color: white;
-        border-radius: 6px;
-        padding: 0.75rem;
-        border: none;
-    }
-
-    .stError {
-        background: #ef4444;
-        color: white;
-        border-radius: 6px;
-        padding: 0.75rem;
-        border: none;
-    }
-
-    .stWarning {
-        background: #f59e0b;
-        color: white;
-        border-radius: 6px;
-        padding: 0.75rem;
-        border: none;
-    }
-
-    .stInfo {
-        background: #3b82f6;
-        color: white;
-        border-radius: 6px;
-        padding: 0.75rem;
-        border: none;
-    }
-
-    /* Crystal Clear Text */
-    .stMarkdown h1, .stMarkdown h2, .stMarkdown h3, .stMarkdown h4, .stMarkdown h5, .stMarkdown h6 {
-        color: #111827;
-        font-weight: 600;
-    }
-
-    .stMarkdown p {
-        color: #374151;
-        line-height: 1.5;
-    }
-
-    /* Clean Labels */
-    .stTextInput > label,
-    .stTextArea > label,
-    .stSelectbox > label,
-    .stNumberInput > label,
-    .stDateInput > label,
-    .stTimeInput > label,
-    .stFileUploader > label {
-        color: #374151;
-        font-weight: 500;
-        font-size: 0.9rem;
-    }
-
-    /* Clean Tables */
-    .stDataFrame {
-        border-radius: 6px;
-        border: 1px solid #e5e7eb;
-    }
-
-    /* Clean Expanders */
-    .streamlit-expanderHeader {
-        background: #f9fafb;
-        border-radius: 6px;
-        border: 1px solid #e5e7eb;
-        color: #374151;
-        font-weight: 500;
-    }
-
-    /* Clean File Upload */
-    .stFileUploader > div {
-        border-radius: 6px;
-        border: 2px dashed #d1d5db;
-        background: #f9fafb;
-    }
-
-    .stFileUploader > div:hover {
-        border-color: #3182ce;
-    }
-
-    /* Clean Metrics */
-    [data-testid="metric-container"] {
-        background: white;
-        border: 1px solid #e5e7eb;
-        padding: 1rem;
-        border-radius: 6px;
-    }
-
-    /* Hide Streamlit Branding */
-    #MainMenu { visibility: hidden; }
-    footer { visibility: hidden; }
-    header { visibility: hidden; }
-    .stDeployButton { display: none; }
-</style>
-""", unsafe_allow_html=True)
+# Clean Modern Healthcare Theme
+@st.cache_resource
+def load_theme_css() -> str:
+    """Read the theme stylesheet once per process"""
+    return (Path(__file__).parent / "assets" / "theme.css").read_text()
+
+st.markdown(f"<style>{load_theme_css()}</style>", unsafe_allow_html=True)
 
 # Session state initialization
 if 'authenticated' not in st.session_state:
@@ -230,61 +80,172 @@ if 'user_data' not in st.session_state:
     st.session_state.user_data = None
 if 'access_token' not in st.session_state:
     st.session_state.access_token = None
+if 'auth_headers' not in st.session_state:
+    st.session_state.auth_headers = None
+if 'api_failures' not in st.session_state:
+    st.session_state.api_failures = {}
 
 # Helper functions
-def make_api_request(endpoint: str, method: str = "GET", data: Dict = None, files: Dict = None) -> Dict[str, Any]:
-    """Make API request with authentication"""
-    headers = {}
-    if st.session_state.access_token:
-        headers["Authorization"] = f"Bearer {st.session_state.access_token}"
-
-    url = f"{API_BASE_URL}{endpoint}"
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """Shared keep-alive session for API calls.
+
+    It is shared by every browser session, so auth headers are passed per
+    request and never stored on it.
+    """
+    session = requests.Session()
+    # 429 responses are retried with exponential backoff (honouring Retry-After)
+    retries = Retry(total=2, backoff_factor=0.1, status_forcelist=[429, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def api_call(path: str, method: str = "GET", headers: Optional[Dict] = None, **kwargs) -> requests.Response:
+    """Send a request to the API over the shared session"""
+    if "json" in kwargs:
+        # Encode JSON bodies with orjson rather than requests' stdlib encoder
+        kwargs["data"] = orjson.dumps(kwargs.pop("json"))
+        headers = {**(headers or {}), "Content-Type": "application/json"}
+    kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+    return get_http_session().request(method, API_BASE_URL + path, headers=headers, **kwargs)
+
+class ApiError(Exception):
+    """Non-200 API response; raised so failed GETs are never cached"""
+
+def decode_json(response: requests.Response) -> Any:
+    """Decode a JSON response body, raising ApiError when it is not JSON"""
+    try:
+        return orjson.loads(response.content)
+    except orjson.JSONDecodeError:
+        raise ApiError(f"Unexpected response from API (HTTP {response.status_code})")
 
+def error_detail(response: requests.Response, default: str = "Unknown error") -> str:
+    """The ``detail`` of an error response; plain-text bodies fall back to the status"""
     try:
-        if method == "GET":
-            response = requests.get(url, headers=headers, params=data)
-        elif method == "POST":
-            if files:
-                response = requests.post(url, headers=headers, data=data, files=files)
-            else:
-                headers["Content-Type"] = "application/json"
-                response = requests.post(url, headers=headers, json=data)
-        elif method == "PUT":
-            headers["Content-Type"] = "application/json"
-            response = requests.put(url, headers=headers, json=data)
-        elif method == "DELETE":
-            response = requests.delete(url, headers=headers)
+        return orjson.loads(response.content).get("detail", default)
+    except orjson.JSONDecodeError:
+        return f"HTTP {response.status_code} {response.reason}"
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_get(endpoint: str, token: Optional[str], params_json: str) -> Any:
+    """GET an endpoint, caching the decoded body per token and params
+
+    Arrow IPC responses (``format=arrow``) decode straight to a DataFrame.
+    """
+    headers = {"Authorization": f"Bearer {token}"} if token else None
+    params = orjson.loads(params_json) if params_json else None
+    response = api_call(endpoint, headers=headers, params=params)
+
+    if response.status_code != 200:
+        raise ApiError(error_detail(response))
+    if response.headers.get("content-type", "").startswith(ARROW_STREAM_MEDIA_TYPE):
+        import pyarrow as pa
+        return pa.ipc.open_stream(response.content).read_pandas()
+    return decode_json(response)
+
+def bust_cache():
+    """Drop cached GET responses so reads after a write are fresh"""
+    _cached_get.clear()
+
+def circuit_open(endpoint: str) -> bool:
+    """True while an endpoint is being skipped after repeated failures"""
+    state = st.session_state.api_failures.get(endpoint)
+    return bool(state) and state["open_until"] > time.time()
+
+def record_api_failure(endpoint: str):
+    """Count a connection failure; trip the breaker after too many in a window"""
+    now = time.time()
+    state = st.session_state.api_failures.setdefault(endpoint, {"count": 0, "since": now, "open_until": 0.0})
+    if now - state["since"] > CIRCUIT_WINDOW_SECONDS:
+        state.update(count=0, since=now)
+    state["count"] += 1
+    if state["count"] >= CIRCUIT_FAILURE_THRESHOLD:
+        state.update(count=0, since=now, open_until=now + CIRCUIT_WINDOW_SECONDS)
+        st.toast(f"API not responding, pausing requests to {endpoint} for {CIRCUIT_WINDOW_SECONDS}s")
 
-        if response.status_code == 200:
-            return {"success": True, "data": response.json()}
-        else:
-            return {"success": False, "error": response.json().get("detail", "Unknown error")}
+def make_api_request(endpoint: str, method: str = "GET", data: Dict = None, files: Dict = None) -> Dict[str, Any]:
+    """Make API request with authentication"""
+    if circuit_open(endpoint):
+        return {"success": False, "error": "Service temporarily unavailable, please retry shortly"}
 
+    try:
+        result = _send_api_request(endpoint, method, data, files)
     except requests.exceptions.RequestException as e:
+        record_api_failure(endpoint)
         return {"success": False, "error": f"Connection error: {str(e)}"}
 
+    st.session_state.api_failures.pop(endpoint, None)
+    return result
+
+def _send_api_request(endpoint: str, method: str, data: Optional[Dict], files: Optional[Dict]) -> Dict[str, Any]:
+    """Perform the request; connection errors propagate to make_api_request"""
+    if method == "GET":
+        params_json = orjson.dumps(data, option=orjson.OPT_SORT_KEYS).decode() if data else ""
+        try:
+            return {"success": True, "data": _cached_get(endpoint, st.session_state.access_token, params_json)}
+        except ApiError as e:
+            return {"success": False, "error": str(e)}
+
+    headers = st.session_state.auth_headers
+
+    if method == "POST" and files:
+        response = api_call(endpoint, method, headers, data=data, files=files)
+    elif method in ("POST", "PUT"):
+        response = api_call(endpoint, method, headers, json=data)
+    elif method == "DELETE":
+        response = api_call(endpoint, method, headers)
+
+    if response.status_code != 200:
+        return {"success": False, "error": error_detail(response)}
+
+    bust_cache()
+    try:
+        return {"success": True, "data": decode_json(response)}
+    except ApiError as e:
+        return {"success": False, "error": str(e)}
+
+def parallel_get(endpoints: list) -> list:
+    """Issue several GET requests concurrently, returning results in order"""
+    # Worker threads need the script context to read session_state
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(max_workers=4, initializer=add_script_run_ctx, initargs=(None, ctx)) as executor:
+        return list(executor.map(make_api_request, endpoints))
+
+def rerun_fragment():
+    """Rerun only the calling fragment, or the whole app during a full run"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+def format_timestamp(value: Optional[str], fmt: str) -> Optional[str]:
+    """Reformat an ISO timestamp from the API for display"""
+    return datetime.fromisoformat(value).strftime(fmt) if value else value
+
 def login_user(username: str, password: str) -> bool:
     """Authenticate user"""
     try:
-        # Make direct API call to test
-        url = f"{API_BASE_URL}/auth/login"
-        headers = {"Content-Type": "application/json"}
         data = {"username": username, "password": password}
-
-        response = requests.post(url, headers=headers, json=data, timeout=10)
+        response = api_call("/auth/login", "POST", json=data)
 
         if response.status_code == 200:
-            result = response.json()
+            result = decode_json(response)
             st.session_state.authenticated = True
             st.session_state.access_token = result["access_token"]
+            # Built once per login instead of on every request
+            st.session_state.auth_headers = {"Authorization": f"Bearer {result['access_token']}"}
             st.session_state.user_data = result
-            st.success("Login successful!")
+            st.toast("Login successful!")
             return True
         else:
-            error_msg = response.json().get("detail", "Login failed")
+            error_msg = error_detail(response, "Login failed")
             st.error(f"Login failed: {error_msg}")
             return False
 
+    except ApiError as e:
+        st.error(f"Login failed: {e}")
+        return False
     except requests.exceptions.RequestException as e:
         st.error(f"Connection error: {str(e)}")
         return False
@@ -294,9 +255,13 @@ def login_user(username: str, password: str) -> bool:
 
 def logout_user():
     """Logout user"""
+    bust_cache()
     st.session_state.authenticated = False
     st.session_state.access_token = None
+    st.session_state.auth_headers = None
     st.session_state.user_data = None
+    for key in ('trend_figures', 'pending_updates', 'records_patient_id'):
+        st.session_state.pop(key, None)
     st.rerun()
 
 def register_user(user_data: Dict) -> bool:
@@ -327,8 +292,8 @@ def show_login_page():
 
             if submit_button:
                 if username and password:
-                    if login_user(username, password):
-                        st.rerun()
+                    # On success main() swaps in the dashboard during this same run
+                    login_user(username, password)
                 else:
                     st.error("Please enter username and password")
 
@@ -343,6 +308,7 @@ def show_login_page():
             st.session_state.show_register = True
             st.rerun()
 
+@st.fragment
 def show_register_page():
     """Display clean registration page"""
     st.markdown('<h1 class="main-header">🏥 Care-Sync Registration</h1>', unsafe_allow_html=True)
@@ -353,40 +319,27 @@ def show_register_page():
         st.markdown("## Create Account")
 
         with st.form("register_form"):
-            username = st.text_input("Username")
-            email = st.text_input("Email")
-            password = st.text_input("Password", type="password")
-            confirm_password = st.text_input("Confirm Password", type="password")
-            full_name = st.text_input("Full Name")
-            role = st.selectbox("Role", ["patient", "doctor", "admin"])
-            phone = st.text_input("Phone (optional)")
-
-            col_a, col_b = st.columns(2)
-            with col_a:
-                date_of_birth = st.date_input("Date of Birth (optional)", value=None)
-            with col_b:
-                gender = st.selectbox("Gender (optional)", ["", "Male", "Female", "Other"])
-
-            address = st.text_area("Address (optional)")
+            values = {}
+            for row in REGISTER_FORM:
+                # Multi-field rows are laid out side by side
+                slots = st.columns(len(row)) if len(row) > 1 else [st.container()]
+                for slot, (key, widget, label, kwargs) in zip(slots, row):
+                    with slot:
+                        values[key] = widget(label, **kwargs)
 
             submit_button = st.form_submit_button("Register")
 
             if submit_button:
-                if not all([username, email, password, confirm_password, full_name]):
+                if not all(values[key] for key in REGISTER_REQUIRED):
                     st.error("Please fill in all required fields")
-                elif password != confirm_password:
+                elif values["password"] != values["confirm_password"]:
                     st.error("Passwords do not match")
                 else:
+                    # Optional fields left blank are sent as null
                     user_data = {
-                        "username": username,
-                        "email": email,
-                        "password": password,
-                        "role": role,
-                        "full_name": full_name,
-                        "phone": phone if phone else None,
-                        "date_of_birth": date_of_birth.isoformat() if date_of_birth else None,
-                        "gender": gender if gender else None,
-                        "address": address if address else None
+                        key: (value.isoformat() if isinstance(value, date) else value) or None
+                        for key, value in values.items()
+                        if key != "confirm_password"
                     }
 
                     if register_user(user_data):
@@ -406,33 +359,9 @@ def show_patient_dashboard():
     # Sidebar navigation
     with st.sidebar:
         st.markdown("### Navigation")
-        page = st.radio("Go to", [
-            "Overview",
-            "Upload Health Records",
-            "My Health Records",
-            "Manage Access",
-            "My Appointments",
-            "Book Appointment",
-            "Health Metrics",
-            "Health Analysis"
-        ])
-
-    if page == "Overview":
-        show_patient_overview()
-    elif page == "Upload Health Records":
-        show_upload_records()
-    elif page == "My Health Records":
-        show_my_records()
-    elif page == "Manage Access":
-        show_manage_access()
-    elif page == "My Appointments":
-        show_my_appointments()
-    elif page == "Health Metrics":
-        show_health_metrics()
-    elif page == "Health Analysis":
-        show_health_analysis()
-    elif page == "Book Appointment":
-        show_book_appointment()
+        page = st.radio("Go to", list(PATIENT_PAGES))
+
+    PATIENT_PAGES[page]()
 
 def show_doctor_dashboard():
     """Display doctor dashboard"""
@@ -442,24 +371,9 @@ def show_doctor_dashboard():
     # Sidebar navigation
     with st.sidebar:
         st.markdown("### Navigation")
-        page = st.radio("Go to", [
-            "Overview",
-            "Search Patients",
-            "Patient Records",
-            "Appointments",
-            "Schedule Appointment"
-        ])
-
-    if page == "Overview":
-        show_doctor_overview()
-    elif page == "Search Patients":
-        show_search_patients()
-    elif page == "Patient Records":
-        show_patient_records()
-    elif page == "Appointments":
-        show_doctor_appointments()
-    elif page == "Schedule Appointment":
-        show_schedule_appointment()
+        page = st.radio("Go to", list(DOCTOR_PAGES))
+
+    DOCTOR_PAGES[page]()
 
 def show_admin_dashboard():
     """Display admin dashboard"""
@@ -469,49 +383,35 @@ def show_admin_dashboard():
     # Sidebar navigation
     with st.sidebar:
         st.markdown("### Admin Navigation")
-        page = st.radio("Go to", [
-            "System Overview",
-            "User Management",
-            "Health Records Oversight",
-            "Appointment Monitoring",
-            "Audit Logs",
-            "System Statistics",
-            "Database Management",
-            "System Configuration"
-        ])
-
-    if page == "System Overview":
-        show_admin_overview()
-    elif page == "User Management":
-        show_user_management()
-    elif page == "Health Records Oversight":
-        show_records_oversight()
-    elif page == "Appointment Monitoring":
-        show_appointment_monitoring()
-    elif page == "Audit Logs":
-        show_audit_logs()
-    elif page == "System Statistics":
-        show_system_statistics()
-    elif page == "Database Management":
-        show_database_management()
-    elif page == "System Configuration":
-        show_system_configuration()
+        page = st.radio("Go to", list(ADMIN_PAGES))
+
+    ADMIN_PAGES[page]()
 
 # Patient dashboard functions
 def show_patient_overview():
     """Show clean patient overview"""
     st.markdown("## Dashboard Overview")
 
+    records, appointments, doctors = parallel_get([
+        "/records/my-records",
+        "/appointments/my-appointments",
+        "/records/active-doctors"
+    ])
+
+    record_count = len(records["data"]["records"]) if records["success"] else 0
+    appointment_count = len(appointments["data"]["appointments"]) if appointments["success"] else 0
+    doctor_count = doctors["data"]["active_doctors"] if doctors["success"] else 0
+
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        st.metric("Health Records", "0", help="Total uploaded records")
+        st.metric("Health Records", str(record_count), help="Total uploaded records")
 
     with col2:
-        st.metric("Appointments", "0", help="Scheduled appointments")
+        st.metric("Appointments", str(appointment_count), help="Scheduled appointments")
 
     with col3:
-        st.metric("Active Doctors", "0", help="Doctors with access")
+        st.metric("Active Doctors", str(doctor_count), help="Doctors with access")
 
     st.markdown("### Quick Actions")
     col_a, col_b, col_c = st.columns(3)
@@ -528,6 +428,7 @@ def show_patient_overview():
         if st.button("📊 View Analytics"):
             st.info("Go to 'Health Analysis' in the sidebar")
 
+@st.fragment
 def show_upload_records():
     """Show upload health records page"""
     st.markdown("### Upload Health Records")
@@ -541,14 +442,11 @@ def show_upload_records():
 
         col1, col2 = st.columns(2)
         with col1:
-            record_type = st.selectbox("Record Type", [
-                "Lab Report", "Prescription", "Diagnosis",
-                "Imaging", "Vaccination", "Other"
-            ])
+            record_type = st.selectbox("Record Type", RECORD_TYPES)
             title = st.text_input("Title")
 
         with col2:
-            record_date = st.date_input("Record Date", value=datetime.now().date())
+            record_date = st.date_input("Record Date", value=date.today())
             description = st.text_area("Description (optional)")
 
         submit_button = st.form_submit_button("Upload Record")
@@ -583,28 +481,39 @@ def show_my_records():
         records = response["data"]["records"]
 
         if records:
-            # Create DataFrame for display
-            df = pd.DataFrame(records)
-            df['record_date'] = pd.to_datetime(df['record_date']).dt.strftime('%Y-%m-%d')
-            df['date_created'] = pd.to_datetime(df['date_created']).dt.strftime('%Y-%m-%d %H:%M')
+            for r in records:
+                r['record_date'] = format_timestamp(r['record_date'], '%Y-%m-%d')
+                r['date_created'] = format_timestamp(r['date_created'], '%Y-%m-%d %H:%M')
 
             # Display records
-            for _, record in df.iterrows():
-                with st.expander(f"{record['title']} - {record['record_type']} ({record['record_date']})"):
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.write(f"**Type:** {record['record_type']}")
-                        st.write(f"**Date:** {record['record_date']}")
-                        st.write(f"**File:** {record['file_name']}")
-                    with col2:
-                        st.write(f"**Uploaded:** {record['date_created']}")
-                        if record['description']:
-                            st.write(f"**Description:** {record['description']}")
+            st.dataframe(
+                records,
+                column_order=['title', 'record_type', 'record_date', 'file_name', 'date_created'],
+                use_container_width=True,
+                hide_index=True
+            )
+
+            selected = st.selectbox(
+                "Details for",
+                range(len(records)),
+                format_func=lambda i: f"{records[i]['title']} - {records[i]['record_type']} ({records[i]['record_date']})"
+            )
+            record = records[selected]
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write(f"**Type:** {record['record_type']}")
+                st.write(f"**Date:** {record['record_date']}")
+                st.write(f"**File:** {record['file_name']}")
+            with col2:
+                st.write(f"**Uploaded:** {record['date_created']}")
+                if record['description']:
+                    st.write(f"**Description:** {record['description']}")
         else:
             st.info("No health records found. Upload your first record!")
     else:
         st.error(f"Failed to load records: {response['error']}")
 
+@st.fragment
 def show_manage_access():
     """Show manage access page"""
     st.markdown("### Manage Record Access")
@@ -654,26 +563,49 @@ def show_my_appointments():
         appointments = response["data"]["appointments"]
 
         if appointments:
-            df = pd.DataFrame(appointments)
-            df['appointment_date'] = pd.to_datetime(df['appointment_date']).dt.strftime('%Y-%m-%d %H:%M')
-
-            for _, apt in df.iterrows():
-                with st.expander(f"Appointment with Doctor ID {apt['doctor_id']} - {apt['appointment_date']}"):
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.write(f"**Date:** {apt['appointment_date']}")
-                        st.write(f"**Duration:** {apt['duration_minutes']} minutes")
-                        st.write(f"**Status:** {apt['status']}")
-                    with col2:
-                        if apt['reason']:
-                            st.write(f"**Reason:** {apt['reason']}")
-                        if apt['notes']:
-                            st.write(f"**Notes:** {apt['notes']}")
+            for a in appointments:
+                a['appointment_date'] = format_timestamp(a['appointment_date'], '%Y-%m-%d %H:%M')
+
+            st.dataframe(
+                appointments,
+                column_order=['appointment_date', 'doctor_id', 'duration_minutes', 'status', 'reason'],
+                use_container_width=True,
+                hide_index=True
+            )
+
+            selected = st.selectbox(
+                "Details for",
+                range(len(appointments)),
+                format_func=lambda i: f"Appointment with Doctor ID {appointments[i]['doctor_id']} - {appointments[i]['appointment_date']}"
+            )
+            apt = appointments[selected]
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write(f"**Date:** {apt['appointment_date']}")
+                st.write(f"**Duration:** {apt['duration_minutes']} minutes")
+                st.write(f"**Status:** {apt['status']}")
+            with col2:
+                if apt['reason']:
+                    st.write(f"**Reason:** {apt['reason']}")
+                if apt['notes']:
+                    st.write(f"**Notes:** {apt['notes']}")
         else:
             st.info("No appointments scheduled.")
     else:
         st.error(f"Failed to load appointments: {response['error']}")
 
+@st.cache_resource
+def demo_doctors_df():
+    """Sample doctor directory shown until real doctor search exists"""
+    import pandas as pd
+
+    return pd.DataFrame([
+        {"ID": 2, "Name": "Dr. Jane Smith", "Specialty": "General Practice", "Rating": "4.8/5"},
+        {"ID": 3, "Name": "Dr. Michael Johnson", "Specialty": "Cardiology", "Rating": "4.9/5"},
+        {"ID": 4, "Name": "Dr. Sarah Wilson", "Specialty": "Dermatology", "Rating": "4.7/5"}
+    ])
+
+@st.fragment
 def show_book_appointment():
     """Show appointment booking interface for patients"""
     st.markdown("### Book New Appointment")
@@ -684,7 +616,7 @@ def show_book_appointment():
     with st.form("doctor_search_form"):
         col1, col2 = st.columns(2)
         with col1:
-            specialty = st.selectbox("Specialty", ["General Practice", "Cardiology", "Dermatology", "Pediatrics", "Other"])
+            specialty = st.selectbox("Specialty", SPECIALTIES)
         with col2:
             location = st.text_input("Preferred Location (optional)")
 
@@ -694,14 +626,7 @@ def show_book_appointment():
             # For now, show available doctors (this would be enhanced with real search)
             st.success("Available doctors found!")
 
-            doctors_data = [
-                {"ID": 2, "Name": "Dr. Jane Smith", "Specialty": "General Practice", "Rating": "4.8/5"},
-                {"ID": 3, "Name": "Dr. Michael Johnson", "Specialty": "Cardiology", "Rating": "4.9/5"},
-                {"ID": 4, "Name": "Dr. Sarah Wilson", "Specialty": "Dermatology", "Rating": "4.7/5"}
-            ]
-
-            df = pd.DataFrame(doctors_data)
-            st.dataframe(df, use_container_width=True)
+            st.dataframe(demo_doctors_df(), use_container_width=True)
 
     st.markdown("#### Book Appointment")
 
@@ -710,11 +635,11 @@ def show_book_appointment():
 
         with col1:
             doctor_id = st.number_input("Doctor ID", min_value=1, step=1, help="Enter the ID of the doctor from the search results above")
-            appointment_date = st.date_input("Preferred Date", min_value=datetime.now().date())
+            appointment_date = st.date_input("Preferred Date", min_value=date.today())
             appointment_time = st.time_input("Preferred Time")
 
         with col2:
-            duration_minutes = st.selectbox("Duration", [30, 45, 60], help="Appointment duration in minutes")
+            duration_minutes = st.selectbox("Duration", APPOINTMENT_DURATIONS, help="Appointment duration in minutes")
             reason = st.text_area("Reason for Visit", help="Brief description of your health concern")
 
         additional_notes = st.text_area("Additional Notes (optional)")
@@ -754,6 +679,7 @@ def show_book_appointment():
             else:
                 st.error("Please fill in all required fields")
 
+@st.fragment
 def show_health_metrics():
     """Show health metrics input"""
     st.markdown("### Health Metrics")
@@ -762,10 +688,7 @@ def show_health_metrics():
         col1, col2 = st.columns(2)
 
         with col1:
-            metric_name = st.selectbox("Metric Type", [
-                "blood_pressure_systolic", "blood_pressure_diastolic",
-                "heart_rate", "temperature", "blood_sugar", "weight", "height"
-            ])
+            metric_name = st.selectbox("Metric Type", METRIC_TYPES)
             value = st.number_input("Value", min_value=0.0, step=0.1)
 
         with col2:
@@ -789,17 +712,93 @@ def show_health_metrics():
 
             if response["success"]:
                 st.success("Health metric added successfully!")
+                if response["data"].get("is_critical"):
+                    st.warning("⚠️ This reading is outside the normal range")
             else:
                 st.error(f"Failed to add metric: {response['error']}")
 
+def lttb_downsample(x, y, threshold: int = 1000):
+    """Largest-Triangle-Three-Buckets downsampling of a (x, y) series.
+
+    Keeps the visual shape of long series while sending at most
+    ``threshold`` points to the browser. Returns indices into x/y.
+    """
+    import numpy as np
+
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    xs = np.asarray(x, dtype=np.float64)
+    ys = np.asarray(y, dtype=np.float64)
+    # Bucket edges for the points between the fixed first and last ones
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        # Average of the next bucket is the third triangle vertex
+        avg_x = xs[end:next_end].mean()
+        avg_y = ys[end:next_end].mean()
+        areas = np.abs(
+            (xs[a] - avg_x) * (ys[start:end] - ys[a])
+            - (xs[a] - xs[start:end]) * (avg_y - ys[a])
+        )
+        a = start + int(areas.argmax())
+        selected[i + 1] = a
+
+    return selected
+
+@st.cache_data
+def downsample_history(history: list):
+    """Metric history as (dates, values) arrays, LTTB-reduced for plotting"""
+    import pandas as pd
+
+    dates = pd.to_datetime([point['recorded_at'] for point in history], format='ISO8601')
+    values = pd.Series([point['value'] for point in history], dtype='float64').to_numpy()
+
+    # Long histories are reduced to a bounded number of points for the browser
+    keep = lttb_downsample(dates.asi8, values)
+    return dates[keep].to_numpy(), values[keep]
+
+def trend_figure(metric_name: str, history: list):
+    """This session's trend figure for a metric, refreshed with the latest history
+
+    The figure shell is built once per session and only its trace data is
+    replaced on later reruns. It is kept in session_state rather than
+    st.cache_resource because it holds one patient's data.
+    """
+    import plotly.graph_objects as go
+
+    figures = st.session_state.setdefault('trend_figures', {})
+    fig = figures.get(metric_name)
+    if fig is None:
+        column = metric_name.replace('_', ' ').title()
+        fig = go.Figure(go.Scattergl(x=[], y=[], mode="lines", name=column))
+        # uirevision keeps zoom/pan across reruns
+        fig.update_layout(
+            margin=dict(l=0, r=0, t=20, b=0), xaxis_title="Date", yaxis_title=column,
+            uirevision=metric_name
+        )
+        figures[metric_name] = fig
+
+    fig.data[0].x, fig.data[0].y = downsample_history(history)
+    return fig
+
+@st.fragment
 def show_health_analysis():
     """Show health analysis with enhanced visualizations"""
     st.markdown("### Health Analysis")
 
-    response = make_api_request("/health-metrics/analysis")
+    # Summary and per-metric history arrive in a single request
+    response = make_api_request("/health-metrics/bundle")
 
     if response["success"]:
         analysis = response["data"]["analysis"]
+        history = response["data"]["history"]
 
         if analysis:
             # Overview metrics
@@ -842,19 +841,13 @@ def show_health_analysis():
                 else:
                     st.success("✅ All values within normal range")
 
-                # Create a simple trend visualization
-                if metric_name in ['blood_pressure_systolic', 'heart_rate', 'temperature']:
-                    # Mock trend data for visualization
-                    import random
-                    dates = pd.date_range(start='2024-12-01', periods=7, freq='D')
-                    values = [data['average'] + random.uniform(-5, 5) for _ in range(7)]
-
-                    trend_df = pd.DataFrame({
-                        'Date': dates,
-                        metric_name.replace('_', ' ').title(): values
-                    })
-
-                    st.line_chart(trend_df.set_index('Date'))
+                # Plot the recorded trend
+                if len(history.get(metric_name, [])) > 1:
+                    st.plotly_chart(
+                        trend_figure(metric_name, history[metric_name]),
+                        use_container_width=True,
+                        key=f"trend_{metric_name}"
+                    )
 
                 st.markdown("---")
         else:
@@ -865,7 +858,7 @@ def show_health_analysis():
             with st.form("quick_metric_form"):
                 col_a, col_b = st.columns(2)
                 with col_a:
-                    quick_metric = st.selectbox("Metric", ["blood_pressure_systolic", "heart_rate", "temperature"])
+                    quick_metric = st.selectbox("Metric", QUICK_METRIC_TYPES)
                     quick_value = st.number_input("Value", min_value=0.0, step=0.1)
                 with col_b:
                     quick_unit = st.text_input("Unit", value="mmHg" if "pressure" in quick_metric else "bpm" if "heart" in quick_metric else "°C")
@@ -882,8 +875,10 @@ def show_health_analysis():
                     response = make_api_request("/health-metrics/add", "POST", data)
 
                     if response["success"]:
-                        st.success("Health metric added! Refresh to see analysis.")
-                        st.rerun()
+                        if response["data"].get("is_critical"):
+                            st.toast("⚠️ Reading is outside the normal range")
+                        # Redraw just this page; the write already cleared the GET cache
+                        rerun_fragment()
                     else:
                         st.error(f"Failed to add metric: {response['error']}")
     else:
@@ -906,8 +901,11 @@ def show_doctor_overview():
     st.markdown("### Today's Schedule")
     st.info("No appointments scheduled for today.")
 
+@st.fragment
 def show_search_patients():
     """Show search patients page"""
+    import pandas as pd
+
     st.markdown("### Search Patients")
 
     with st.form("search_form"):
@@ -918,7 +916,7 @@ def show_search_patients():
         with col2:
             age_max = st.number_input("Max Age", min_value=0, max_value=120, value=120)
         with col3:
-            gender = st.selectbox("Gender", ["", "Male", "Female", "Other"])
+            gender = st.selectbox("Gender", GENDERS)
 
         search_button = st.form_submit_button("Search Patients")
 
@@ -938,13 +936,15 @@ def show_search_patients():
 
                 if patients:
                     st.markdown("### Search Results")
-                    df = pd.DataFrame(patients)
+                    df = (pd.DataFrame.from_records(patients, columns=PATIENT_SEARCH_COLUMNS)
+                          .astype(PATIENT_SEARCH_DTYPES))
                     st.dataframe(df, use_container_width=True)
                 else:
                     st.info("No patients found matching the criteria.")
             else:
                 st.error(f"Search failed: {response['error']}")
 
+@st.fragment
 def show_patient_records():
     """Show patient records for doctors"""
     st.markdown("### Patient Records")
@@ -953,36 +953,57 @@ def show_patient_records():
     st.markdown("#### Select Patient")
     patient_id = st.number_input("Enter Patient ID", min_value=1, step=1, help="Enter the ID of the patient whose records you want to view")
 
+    # Remember the loaded patient so row selections (which rerun) keep the table
     if st.button("Load Patient Records"):
-        if patient_id:
-            response = make_api_request(f"/doctors/patient-records/{patient_id}")
-
-            if response["success"]:
-                records = response["data"]["records"]
-
-                if records:
-                    st.success(f"Found {len(records)} record(s) for Patient ID {patient_id}")
-
-                    for record in records:
-                        with st.expander(f"{record['title']} - {record['record_type']} ({record['record_date']})"):
-                            col1, col2 = st.columns(2)
-                            with col1:
-                                st.write(f"**Type:** {record['record_type']}")
-                                st.write(f"**Date:** {record['record_date']}")
-                                st.write(f"**Title:** {record['title']}")
-                            with col2:
-                                if record['description']:
-                                    st.write(f"**Description:** {record['description']}")
-                                if record.get('metadata'):
-                                    metadata = record['metadata']
-                                    if isinstance(metadata, dict):
-                                        st.write(f"**File Size:** {metadata.get('file_size', 'N/A')} bytes")
-                                        st.write(f"**File Type:** {metadata.get('file_type', 'N/A')}")
+        st.session_state['records_patient_id'] = patient_id
+
+    patient_id = st.session_state.get('records_patient_id')
+    if patient_id:
+        response = make_api_request(f"/doctors/patient-records/{patient_id}")
+
+        if response["success"]:
+            records = response["data"]["records"]
+
+            if records:
+                st.success(f"Found {len(records)} record(s) for Patient ID {patient_id}")
+
+                for r in records:
+                    r['record_date'] = format_timestamp(r['record_date'], '%Y-%m-%d')
+
+                # One table; details render only for the selected row
+                event = st.dataframe(
+                    records,
+                    column_order=['title', 'record_type', 'record_date', 'description'],
+                    use_container_width=True,
+                    hide_index=True,
+                    on_select="rerun",
+                    selection_mode="single-row",
+                    key="patient_records_table"
+                )
+
+                # A stale selection can outlive rows that have since disappeared
+                selected = [i for i in event.selection.rows if i < len(records)]
+                if selected:
+                    record = records[selected[0]]
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.write(f"**Type:** {record['record_type']}")
+                        st.write(f"**Date:** {record['record_date']}")
+                        st.write(f"**Title:** {record['title']}")
+                    with col2:
+                        if record['description']:
+                            st.write(f"**Description:** {record['description']}")
+                        metadata = record['metadata']
+                        st.write(f"**File Size:** {metadata.get('file_size') or 'N/A'} bytes")
+                        st.write(f"**File Type:** {metadata.get('file_type') or 'N/A'}")
                 else:
-                    st.info(f"No accessible records found for Patient ID {patient_id}")
+                    st.caption("Select a row to see record details")
             else:
-                st.error(f"Failed to load patient records: {response['error']}")
+                st.info(f"No accessible records found for Patient ID {patient_id}")
+        else:
+            st.error(f"Failed to load patient records: {response['error']}")
 
+@st.fragment
 def show_doctor_appointments():
     """Show doctor's appointments with management options"""
     st.markdown("### My Appointments")
@@ -995,48 +1016,76 @@ def show_doctor_appointments():
         if appointments:
             st.success(f"You have {len(appointments)} appointment(s)")
 
+            # Confirm/Cancel clicks are staged here and sent in one request
+            pending = st.session_state.setdefault('pending_updates', {})
+
             for apt in appointments:
-                with st.expander(f"Patient ID {apt['patient_id']} - {apt['appointment_date']} ({apt['status']})"):
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.write(f"**Date:** {apt['appointment_date']}")
-                        st.write(f"**Duration:** {apt['duration_minutes']} minutes")
-                        st.write(f"**Status:** {apt['status']}")
-                        if apt['reason']:
-                            st.write(f"**Reason:** {apt['reason']}")
+                apt['appointment_date'] = format_timestamp(apt['appointment_date'], '%Y-%m-%d %H:%M')
+                apt['pending_change'] = pending.get(apt['id'], "")
+
+            # One table; details and actions render only for the selected row
+            event = st.dataframe(
+                appointments,
+                column_order=['patient_id', 'appointment_date', 'duration_minutes', 'status', 'pending_change', 'reason'],
+                use_container_width=True,
+                hide_index=True,
+                on_select="rerun",
+                selection_mode="single-row",
+                key="doctor_appointments_table"
+            )
+
+            selected = [i for i in event.selection.rows if i < len(appointments)]
+            if selected:
+                apt = appointments[selected[0]]
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.write(f"**Patient ID:** {apt['patient_id']}")
+                    st.write(f"**Date:** {apt['appointment_date']}")
+                    st.write(f"**Duration:** {apt['duration_minutes']} minutes")
+                    st.write(f"**Status:** {apt['status']}")
+                    if apt['reason']:
+                        st.write(f"**Reason:** {apt['reason']}")
 
-                    with col2:
-                        if apt['notes']:
-                            st.write(f"**Notes:** {apt['notes']}")
-
-                        # Appointment management buttons
-                        if apt['status'] == 'pending':
-                            col_a, col_b = st.columns(2)
-                            with col_a:
-                                if st.button(f"✅ Confirm", key=f"confirm_{apt['id']}"):
-                                    # Update appointment status
-                                    update_data = {"status": "confirmed"}
-                                    update_response = make_api_request(f"/appointments/{apt['id']}/update", "PUT", update_data)
-                                    if update_response["success"]:
-                                        st.success("Appointment confirmed!")
-                                        st.rerun()
-                                    else:
-                                        st.error("Failed to confirm appointment")
-
-                            with col_b:
-                                if st.button(f"❌ Cancel", key=f"cancel_{apt['id']}"):
-                                    update_data = {"status": "cancelled"}
-                                    update_response = make_api_request(f"/appointments/{apt['id']}/update", "PUT", update_data)
-                                    if update_response["success"]:
-                                        st.success("Appointment cancelled!")
-                                        st.rerun()
-                                    else:
-                                        st.error("Failed to cancel appointment")
+                with col2:
+                    if apt['notes']:
+                        st.write(f"**Notes:** {apt['notes']}")
+
+                    # Appointment management buttons
+                    if apt['status'] == 'pending':
+                        col_a, col_b = st.columns(2)
+                        with col_a:
+                            st.button("✅ Confirm", key=f"confirm_{apt['id']}",
+                                      on_click=pending.__setitem__, args=(apt['id'], "confirmed"))
+                        with col_b:
+                            st.button("❌ Cancel", key=f"cancel_{apt['id']}",
+                                      on_click=pending.__setitem__, args=(apt['id'], "cancelled"))
+
+                        if apt['id'] in pending:
+                            st.info(f"Will be marked {pending[apt['id']]}")
+            else:
+                st.caption("Select a row to see details and confirm or cancel")
+
+            if pending:
+                st.markdown(f"**{len(pending)} change(s) pending**")
+                col_apply, col_discard = st.columns(2)
+                with col_apply:
+                    if st.button("Apply changes", key="apply_appointment_updates"):
+                        updates = [{"id": apt_id, "status": new_status} for apt_id, new_status in pending.items()]
+                        update_response = make_api_request("/appointments/bulk-update", "POST", {"updates": updates})
+                        if update_response["success"]:
+                            pending.clear()
+                            st.toast("Appointments updated!")
+                            rerun_fragment()
+                        else:
+                            st.error(f"Failed to update appointments: {update_response['error']}")
+                with col_discard:
+                    st.button("Discard changes", key="discard_appointment_updates", on_click=pending.clear)
         else:
             st.info("No appointments scheduled.")
     else:
         st.error(f"Failed to load appointments: {response['error']}")
 
+@st.fragment
 def show_schedule_appointment():
     """Show appointment scheduling interface for doctors"""
     st.markdown("### Schedule New Appointment")
@@ -1082,8 +1131,13 @@ def show_admin_overview():
     """Show admin system overview"""
     st.markdown("### System Overview")
 
-    # Get system statistics
-    response = make_api_request("/admin/statistics")
+    # Get system statistics, fetching the user list and recent audit logs
+    # alongside so the other admin pages open from the warm cache
+    response, _, _ = parallel_get([
+        "/admin/statistics",
+        "/admin/users?format=arrow",
+        AUDIT_LOG_ENDPOINT
+    ])
 
     if response["success"]:
         stats = response["data"]["statistics"]
@@ -1123,42 +1177,43 @@ def show_user_management():
     """Show user management interface"""
     st.markdown("### User Management")
 
-    # Get all users
-    response = make_api_request("/admin/users")
+    # Get all users as an Arrow-backed DataFrame
+    response = make_api_request("/admin/users?format=arrow")
 
     if response["success"]:
-        users = response["data"]["users"]
-
-        if users:
-            st.success(f"Managing {len(users)} users")
+        df = response["data"]
 
-            # Create DataFrame for display
-            df = pd.DataFrame(users)
-            df['created_at'] = pd.to_datetime(df['created_at']).dt.strftime('%Y-%m-%d')
+        if not df.empty:
+            st.success(f"Managing {len(df)} users")
 
             # Display users table
-            st.dataframe(df[['id', 'username', 'full_name', 'role', 'email', 'is_active', 'created_at']],
+            st.dataframe(df,
+                        column_order=['id', 'username', 'full_name', 'role', 'email', 'is_active', 'created_at'],
+                        column_config={"created_at": st.column_config.DatetimeColumn(format="YYYY-MM-DD")},
                         use_container_width=True)
 
-            # User actions
+            # User actions; picking a user inside the form doesn't rerun the
+            # page, only pressing one of the actions does
             st.markdown("#### User Actions")
-            selected_user_id = st.selectbox("Select User",
-                                          options=[u['id'] for u in users],
-                                          format_func=lambda x: f"ID {x}: {next(u['full_name'] for u in users if u['id'] == x)}")
+            names = dict(zip(df['id'], df['full_name']))
+            with st.form("user_actions"):
+                selected_user_id = st.selectbox("Select User",
+                                              options=list(names),
+                                              format_func=lambda x: f"ID {x}: {names[x]}")
 
-            col1, col2, col3 = st.columns(3)
+                col1, col2, col3 = st.columns(3)
 
-            with col1:
-                if st.button("🔒 Deactivate User"):
-                    st.warning("User deactivation functionality would be implemented here")
+                with col1:
+                    if st.form_submit_button("🔒 Deactivate User"):
+                        st.warning("User deactivation functionality would be implemented here")
 
-            with col2:
-                if st.button("✅ Activate User"):
-                    st.info("User activation functionality would be implemented here")
+                with col2:
+                    if st.form_submit_button("✅ Activate User"):
+                        st.info("User activation functionality would be implemented here")
 
-            with col3:
-                if st.button("🔄 Reset Password"):
-                    st.info("Password reset functionality would be implemented here")
+                with col3:
+                    if st.form_submit_button("🔄 Reset Password"):
+                        st.info("Password reset functionality would be implemented here")
         else:
             st.info("No users found")
     else:
@@ -1166,39 +1221,50 @@ def show_user_management():
 
 def show_records_oversight():
     """Show health records oversight (anonymized)"""
+    import pandas as pd
+
     st.markdown("### Health Records Oversight")
 
     st.info("📊 Anonymized health records overview for compliance monitoring")
 
-    # Mock data for demonstration
+    # Counts and sizes come pre-aggregated per record type, month and file type
+    response = make_api_request("/admin/records-summary")
+
+    if not response["success"]:
+        st.error(f"Failed to load records summary: {response['error']}")
+        return
+
+    summary = pd.DataFrame(response["data"]["summary"],
+                           columns=["record_type", "month_bucket", "file_type", "count", "total_size"])
+    total_records = int(summary["count"].sum())
+    total_size = int(summary["total_size"].sum())
+    this_month = datetime.now().strftime("%Y-%m")
+
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        st.metric("Total Records", "156")
-        st.metric("Records This Month", "23")
+        st.metric("Total Records", total_records)
+        st.metric("Records This Month", int(summary.loc[summary["month_bucket"] == this_month, "count"].sum()))
 
     with col2:
-        st.metric("Average File Size", "2.3 MB")
-        st.metric("Storage Used", "358 MB")
+        st.metric("Average File Size", f"{total_size / total_records / 1e6:.1f} MB" if total_records else "N/A")
+        st.metric("Storage Used", f"{total_size / 1e6:.1f} MB")
 
     with col3:
-        st.metric("PDF Files", "89")
-        st.metric("Image Files", "67")
+        st.metric("PDF Files", int(summary.loc[summary["file_type"] == "application/pdf", "count"].sum()))
+        st.metric("Image Files", int(summary.loc[summary["file_type"].str.startswith("image/"), "count"].sum()))
 
     # Record type distribution
     st.markdown("#### Record Type Distribution")
-    record_types = ["Lab Report", "Prescription", "Diagnosis", "Imaging", "Vaccination", "Other"]
-    record_counts = [45, 32, 28, 25, 15, 11]
-
-    # Create a simple bar chart using Streamlit
-    chart_data = pd.DataFrame({
-        'Record Type': record_types,
-        'Count': record_counts
-    })
-    st.bar_chart(chart_data.set_index('Record Type'))
+    chart_data = (summary.groupby("record_type")["count"].sum()
+                  .reindex(RECORD_TYPES, fill_value=0)
+                  .rename_axis("Record Type").rename("Count"))
+    st.bar_chart(chart_data)
 
 def show_appointment_monitoring():
     """Show appointment system monitoring"""
+    import pandas as pd
+
     st.markdown("### Appointment System Monitoring")
 
     # Appointment statistics
@@ -1235,42 +1301,47 @@ def show_appointment_monitoring():
 
 def show_audit_logs():
     """Show audit logs with filtering"""
+    import pandas as pd
+
     st.markdown("### Audit Logs")
 
-    # Get audit logs
-    response = make_api_request("/admin/audit-logs?limit=50")
+    # Get audit logs; action and user_id arrive dictionary-encoded, so they
+    # decode to categorical columns without a per-row conversion here
+    response = make_api_request(AUDIT_LOG_ENDPOINT)
 
     if response["success"]:
-        logs = response["data"]["logs"]
-
-        if logs:
-            st.success(f"Showing {len(logs)} recent audit log entries")
+        df = response["data"]
 
-            # Create DataFrame
-            df = pd.DataFrame(logs)
-            df['timestamp'] = pd.to_datetime(df['timestamp']).dt.strftime('%Y-%m-%d %H:%M:%S')
+        if not df.empty:
+            st.success(f"Showing {len(df)} recent audit log entries")
 
-            # Filters
+            # Filters only take effect (and rerun the page) on Apply
             st.markdown("#### Filters")
-            col1, col2 = st.columns(2)
+            with st.form("log_filters"):
+                col1, col2 = st.columns(2)
 
-            with col1:
-                action_filter = st.selectbox("Filter by Action",
-                                           options=["All"] + list(df['action'].unique()))
+                with col1:
+                    action_filter = st.selectbox("Filter by Action",
+                                               options=["All"] + list(df['action'].cat.categories))
 
-            with col2:
-                user_filter = st.selectbox("Filter by User ID",
-                                         options=["All"] + list(df['user_id'].unique()))
+                with col2:
+                    user_filter = st.selectbox("Filter by User ID",
+                                             options=["All"] + list(df['user_id'].cat.categories))
+
+                st.form_submit_button("Apply")
 
-            # Apply filters
-            filtered_df = df.copy()
+            # Apply filters as one combined mask over the category codes
+            mask = pd.Series(True, index=df.index)
             if action_filter != "All":
-                filtered_df = filtered_df[filtered_df['action'] == action_filter]
+                mask &= df['action'] == action_filter
             if user_filter != "All":
-                filtered_df = filtered_df[filtered_df['user_id'] == user_filter]
+                mask &= df['user_id'] == user_filter
+            filtered_df = df[mask]
 
             # Display filtered logs
-            st.dataframe(filtered_df[['timestamp', 'user_id', 'action', 'record_id', 'ip_address']],
+            st.dataframe(filtered_df,
+                        column_order=['timestamp', 'user_id', 'action', 'record_id', 'ip_address'],
+                        column_config={"timestamp": st.column_config.DatetimeColumn(format="YYYY-MM-DD HH:mm:ss")},
                         use_container_width=True)
         else:
             st.info("No audit logs found")
@@ -1279,6 +1350,8 @@ def show_audit_logs():
 
 def show_system_statistics():
     """Show detailed system statistics"""
+    import pandas as pd
+
     st.markdown("### System Statistics")
 
     response = make_api_request("/admin/statistics")
@@ -1401,6 +1474,37 @@ def show_system_configuration():
         st.info("Changes will take effect after system restart.")
 
 # Main application logic
+# Sidebar navigation: page label -> page function
+PATIENT_PAGES = {
+    "Overview": show_patient_overview,
+    "Upload Health Records": show_upload_records,
+    "My Health Records": show_my_records,
+    "Manage Access": show_manage_access,
+    "My Appointments": show_my_appointments,
+    "Book Appointment": show_book_appointment,
+    "Health Metrics": show_health_metrics,
+    "Health Analysis": show_health_analysis
+}
+
+DOCTOR_PAGES = {
+    "Overview": show_doctor_overview,
+    "Search Patients": show_search_patients,
+    "Patient Records": show_patient_records,
+    "Appointments": show_doctor_appointments,
+    "Schedule Appointment": show_schedule_appointment
+}
+
+ADMIN_PAGES = {
+    "System Overview": show_admin_overview,
+    "User Management": show_user_management,
+    "Health Records Oversight": show_records_oversight,
+    "Appointment Monitoring": show_appointment_monitoring,
+    "Audit Logs": show_audit_logs,
+    "System Statistics": show_system_statistics,
+    "Database Management": show_database_management,
+    "System Configuration": show_system_configuration
+}
+
 def main():
     """Main application function"""
     # Check if user wants to register
@@ -1412,8 +1516,14 @@ def main():
         if st.session_state.show_register:
             show_register_page()
         else:
-            show_login_page()
-    else:
+            login_slot = st.empty()
+            with login_slot.container():
+                show_login_page()
+            # A successful login clears the form and falls through to the dashboard
+            if st.session_state.authenticated:
+                login_slot.empty()
+
+    if st.session_state.authenticated:
         # Show logout button in sidebar
         with st.sidebar:
             st.markdown("---")
@@ -2,6 +2,7 @@
 Configuration settings for Care-Sync Application
 """
 import os
+from enum import IntFlag
 from pathlib import Path
 
 # Base directory
@@ -9,19 +10,32 @@ BASE_DIR = Path(__file__).parent
 
 # Database configuration
 DATABASE_URL = "sqlite:///./care_sync.db"
+ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./care_sync.db"
 
 # Security settings
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Authentication cache settings (seconds)
+TOKEN_CACHE_TTL = 30
+USER_CACHE_TTL = 60
+PASSWORD_CACHE_TTL = 60
+USE_VERIFY_PASSWORD_CACHE = os.getenv("USE_VERIFY_PASSWORD_CACHE", "False").lower() == "true"
 
 # File upload settings
 UPLOAD_DIR = BASE_DIR / "uploads"
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
 ALLOWED_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png', '.txt', '.doc', '.docx'}
 
+# Audit log settings
+MAX_AUDIT_LOG_LIMIT = 1000
+
 # Encryption settings
 ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY", "your-encryption-key-change-in-production")
+DEV_ENCRYPTION_KEY_FILE = BASE_DIR / ".dev_encryption_key"  # generated once when ENCRYPTION_KEY is unset
 
 # Application settings
 APP_NAME = "Care-Sync"
@@ -37,6 +51,19 @@ class UserRole:
     DOCTOR = "doctor"
     ADMIN = "admin"
 
+# Role bitmasks for permission checks
+class RoleMask(IntFlag):
+    PATIENT = 1
+    DOCTOR = 2
+    ADMIN = 4
+    CLINICAL = PATIENT | DOCTOR
+
+ROLE_MASKS = {
+    UserRole.PATIENT: RoleMask.PATIENT,
+    UserRole.DOCTOR: RoleMask.DOCTOR,
+    UserRole.ADMIN: RoleMask.ADMIN
+}
+
 # Health record types
 class RecordType:
     LAB_REPORT = "Lab Report"
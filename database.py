@@ -1,15 +1,61 @@
 """
 Database models and setup for Care-Sync Application
 """
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Float
+from sqlalchemy import create_engine, event, select, delete, func, Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Float, Index, JSON
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime, timezone
-from config import DATABASE_URL
+from functools import lru_cache
+import orjson
+from config import DATABASE_URL, ASYNC_DATABASE_URL, ROLE_MASKS
+
+# Per-connection SQLite tuning: WAL lets dashboard readers run alongside a
+# writer, and NORMAL sync is safe under WAL while skipping most fsyncs
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-64000",
+)
+
+# JSON columns are (de)serialized with orjson instead of the stdlib json module
+JSON_CODEC = {
+    "json_serializer": lambda obj: orjson.dumps(obj).decode(),
+    "json_deserializer": orjson.loads,
+}
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
 
 # Database setup
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+@lru_cache(maxsize=1)
+def get_engine():
+    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False}, **JSON_CODEC)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _apply_sqlite_pragmas)
+    return engine
+
+@lru_cache(maxsize=1)
+def get_sessionmaker():
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+# Async engine used by the API; the sync engine above serves scripts like init_db
+@lru_cache(maxsize=1)
+def get_async_engine():
+    engine = create_async_engine(ASYNC_DATABASE_URL, **JSON_CODEC)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    return engine
+
+@lru_cache(maxsize=1)
+def get_async_sessionmaker():
+    return async_sessionmaker(get_async_engine(), autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 # Database models
@@ -20,7 +66,7 @@ class User(Base):
     username = Column(String, unique=True, index=True, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
-    role = Column(String, nullable=False)  # patient, doctor, admin
+    role = Column(String, nullable=False, index=True)  # patient, doctor, admin
     full_name = Column(String, nullable=False)
     phone = Column(String)
     date_of_birth = Column(DateTime)
@@ -34,18 +80,23 @@ class User(Base):
     doctor_appointments = relationship("Appointment", back_populates="doctor", foreign_keys="Appointment.doctor_id")
     patient_appointments = relationship("Appointment", back_populates="patient", foreign_keys="Appointment.patient_id")
 
+    @property
+    def role_mask(self):
+        """Bitmask for the user's role, used for single-AND permission checks"""
+        return ROLE_MASKS.get(self.role, 0)
+
 class HealthRecord(Base):
     __tablename__ = "health_records"
 
     id = Column(Integer, primary_key=True, index=True)
-    patient_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    patient_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     record_type = Column(String, nullable=False)
     title = Column(String, nullable=False)
     description = Column(Text)
     file_path = Column(String)
     file_name = Column(String)
     file_size = Column(Integer)
-    record_metadata = Column(Text)  # JSON string for additional metadata
+    record_metadata = Column(JSON)  # additional file metadata
     date_created = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     record_date = Column(DateTime, nullable=False)
     is_encrypted = Column(Boolean, default=True)
@@ -70,6 +121,10 @@ class RecordAccess(Base):
     doctor = relationship("User", foreign_keys=[doctor_id])
     granter = relationship("User", foreign_keys=[granted_by])
 
+    __table_args__ = (
+        Index("ix_record_access_doctor_active_record", "doctor_id", "is_active", "record_id"),
+    )
+
 class Appointment(Base):
     __tablename__ = "appointments"
 
@@ -88,6 +143,11 @@ class Appointment(Base):
     patient = relationship("User", back_populates="patient_appointments", foreign_keys=[patient_id])
     doctor = relationship("User", back_populates="doctor_appointments", foreign_keys=[doctor_id])
 
+    __table_args__ = (
+        Index("ix_appointments_doctor_date", "doctor_id", "appointment_date"),
+        Index("ix_appointments_patient_date", "patient_id", "appointment_date"),
+    )
+
 class AccessLog(Base):
     __tablename__ = "access_logs"
 
@@ -103,6 +163,12 @@ class AccessLog(Base):
     user = relationship("User")
     record = relationship("HealthRecord")
 
+    __table_args__ = (
+        # id breaks timestamp ties for the audit log's keyset pagination
+        Index("ix_access_logs_timestamp_id_desc", timestamp.desc(), id.desc()),
+        Index("ix_access_logs_user_timestamp", "user_id", "timestamp"),
+    )
+
 class HealthMetric(Base):
     __tablename__ = "health_metrics"
 
@@ -118,14 +184,79 @@ class HealthMetric(Base):
     # Relationships
     patient = relationship("User")
 
+    # Covers the per-patient history/analysis scans ordered by metric then time;
+    # on PostgreSQL a BRIN index also serves time-window scans of this
+    # append-only table at a fraction of a B-tree's size
+    __table_args__ = (
+        Index("ix_health_metrics_patient_name_time", "patient_id", "metric_name", "recorded_at"),
+        Index("ix_health_metrics_recorded_at_brin", "recorded_at", postgresql_using="brin")
+        .ddl_if(dialect="postgresql"),
+    )
+
+class RecordsSummary(Base):
+    """Health record counts and sizes pre-aggregated per type, month and file type.
+
+    Kept current by the HealthRecord mapper events below so the admin
+    oversight page reads a handful of rows instead of scanning every record.
+    """
+    __tablename__ = "records_summary"
+
+    record_type = Column(String, primary_key=True)
+    month_bucket = Column(String, primary_key=True)  # YYYY-MM of upload
+    file_type = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    total_size = Column(Integer, nullable=False, default=0)
+
+def _summary_key(record: HealthRecord) -> dict:
+    uploaded = record.date_created or datetime.now(timezone.utc)
+    return {
+        "record_type": record.record_type,
+        "month_bucket": uploaded.strftime("%Y-%m"),
+        "file_type": (record.record_metadata or {}).get("file_type", "unknown"),
+    }
+
+def _bump_records_summary(connection, record: HealthRecord, sign: int):
+    size = (record.file_size or 0) * sign
+    stmt = sqlite_insert(RecordsSummary).values(**_summary_key(record), count=sign, total_size=size)
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=["record_type", "month_bucket", "file_type"],
+        set_={
+            "count": RecordsSummary.count + sign,
+            "total_size": RecordsSummary.total_size + size,
+        },
+    ))
+
+@event.listens_for(HealthRecord, "after_insert")
+def _summary_after_insert(mapper, connection, target):
+    _bump_records_summary(connection, target, 1)
+
+@event.listens_for(HealthRecord, "after_delete")
+def _summary_after_delete(mapper, connection, target):
+    _bump_records_summary(connection, target, -1)
+
+def rebuild_records_summary(connection):
+    """Recompute the summary table from health_records in one GROUP BY"""
+    month_bucket = func.strftime("%Y-%m", HealthRecord.date_created)
+    file_type = func.coalesce(HealthRecord.record_metadata["file_type"].as_string(), "unknown")
+    connection.execute(delete(RecordsSummary))
+    connection.execute(
+        RecordsSummary.__table__.insert().from_select(
+            ["record_type", "month_bucket", "file_type", "count", "total_size"],
+            select(
+                HealthRecord.record_type, month_bucket, file_type,
+                func.count(), func.coalesce(func.sum(HealthRecord.file_size), 0)
+            ).group_by(HealthRecord.record_type, month_bucket, file_type)
+        )
+    )
+
 # Create tables
 def create_tables():
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
+    # Backfill the summary for records written before it existed
+    with get_engine().begin() as connection:
+        rebuild_records_summary(connection)
 
 # Database dependency
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with get_async_sessionmaker()() as db:
         yield db
-    finally:
-        db.close()
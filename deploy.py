@@ -13,34 +13,50 @@ def create_huggingface_files():
     hf_app_content = '''"""
 Hugging Face Spaces entry point for Care-Sync
 """
-import subprocess
 import threading
 import time
+import urllib.request
 import streamlit as st
 from database import create_tables
 
 def start_api_server():
-    """Start the FastAPI server in background"""
+    """Run the FastAPI server in this process (call from a background thread)"""
+    import uvicorn
+
     try:
-        subprocess.run([
-            "python", "-m", "uvicorn", "api:app", 
-            "--host", "0.0.0.0", "--port", "8000"
-        ], check=True)
+        config = uvicorn.Config("api:app", host="0.0.0.0", port=8000, log_level="info")
+        uvicorn.Server(config).run()
     except Exception as e:
         print(f"Failed to start API server: {e}")
 
-def main():
-    """Main function for Hugging Face deployment"""
-    # Initialize database
+def wait_for_api(url="http://127.0.0.1:8000/health", timeout=10.0):
+    """Poll the API health endpoint until it answers or the timeout passes"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=0.2)
+            return True
+        except Exception:
+            time.sleep(0.05)
+    return False
+
+@st.cache_resource
+def start_backend():
+    """Initialize the database and start the API once per process, not per rerun"""
     create_tables()
-    
+
     # Start API server in background thread
     api_thread = threading.Thread(target=start_api_server, daemon=True)
     api_thread.start()
-    
-    # Give API server time to start
-    time.sleep(3)
-    
+
+    # Wait until the API server answers instead of sleeping a fixed time
+    wait_for_api()
+    return api_thread
+
+def main():
+    """Main function for Hugging Face deployment"""
+    start_backend()
+
     # Import and run the main Streamlit app
     from app import main as app_main
     app_main()
@@ -49,33 +65,34 @@ if __name__ == "__main__":
     main()
 '''
     
-    with open("hf_app.py", "w") as f:
-        f.write(hf_app_content)
+    Path("hf_app.py").write_text(hf_app_content)
     
     # Create requirements.txt for Hugging Face
-    hf_requirements = """streamlit==1.28.1
+    hf_requirements = """streamlit==1.37.0
 fastapi==0.104.1
 uvicorn==0.24.0
-sqlalchemy==2.0.23
+sqlalchemy[asyncio]==2.0.23
+aiosqlite==0.19.0
 pandas==2.1.3
 numpy==1.24.3
+pyarrow==14.0.1
 python-multipart==0.0.6
-python-jose[cryptography]==3.3.0
-passlib[bcrypt]==1.7.4
+PyJWT==2.8.0
+cachetools==5.3.2
 cryptography==41.0.7
 Pillow==10.1.0
 PyPDF2==3.0.1
 plotly==5.17.0
 bcrypt==4.1.1
 pydantic==2.5.0
+orjson==3.9.10
 email-validator==2.1.0
 python-dateutil==2.8.2
 requests==2.31.0
 aiofiles==23.2.1
 jinja2==3.1.2"""
     
-    with open("hf_requirements.txt", "w") as f:
-        f.write(hf_requirements)
+    Path("hf_requirements.txt").write_text(hf_requirements)
     
     # Create README for Hugging Face
     hf_readme = """---
@@ -84,7 +101,7 @@ emoji: 🏥
 colorFrom: blue
 colorTo: green
 sdk: streamlit
-sdk_version: 1.28.1
+sdk_version: 1.37.0
 app_file: hf_app.py
 pinned: false
 license: mit
@@ -120,29 +137,38 @@ A secure web-based application for managing patient health records with role-bas
 - HIPAA-compliant design
 """
     
-    with open("HF_README.md", "w") as f:
-        f.write(hf_readme)
+    Path("HF_README.md").write_text(hf_readme)
     
     print("✓ Hugging Face deployment files created")
 
 def create_docker_files():
     """Create Docker files for containerized deployment"""
     
-    dockerfile_content = """FROM python:3.9-slim
-
-WORKDIR /app
+    dockerfile_content = """# Build stage: compilers and headers stay here, out of the runtime image
+FROM python:3.9-slim AS build
 
-# Install system dependencies
-RUN apt-get update && apt-get install -y \\
+RUN apt-get update && apt-get install -y --no-install-recommends \\
     gcc \\
     && rm -rf /var/lib/apt/lists/*
 
-# Copy requirements and install Python dependencies
+# Install Python dependencies into a venv, precompiling their bytecode
+RUN python -m venv /opt/venv
+ENV PATH=/opt/venv/bin:$PATH
 COPY requirements.txt .
-RUN pip install --no-cache-dir -r requirements.txt
+RUN pip install --no-cache-dir --compile -r requirements.txt
+
+# Runtime stage: only the interpreter, the venv and the app
+FROM python:3.9-slim
+
+ENV PATH=/opt/venv/bin:$PATH \\
+    PYTHONUNBUFFERED=1
+COPY --from=build /opt/venv /opt/venv
+
+WORKDIR /app
 
-# Copy application files
+# Copy application files and precompile them
 COPY . .
+RUN python -m compileall -q .
 
 # Create uploads directory
 RUN mkdir -p uploads
@@ -157,8 +183,7 @@ EXPOSE 8000 8501
 CMD ["sh", "-c", "python api.py & streamlit run app.py --server.port 8501 --server.address 0.0.0.0"]
 """
     
-    with open("Dockerfile", "w") as f:
-        f.write(dockerfile_content)
+    Path("Dockerfile").write_text(dockerfile_content)
     
     # Docker compose file
     docker_compose_content = """version: '3.8'
@@ -178,8 +203,7 @@ services:
       - DEBUG=False
 """
     
-    with open("docker-compose.yml", "w") as f:
-        f.write(docker_compose_content)
+    Path("docker-compose.yml").write_text(docker_compose_content)
     
     print("✓ Docker deployment files created")
 
@@ -263,8 +287,7 @@ def create_deployment_guide():
 - Incident response plan
 """
     
-    with open("DEPLOYMENT.md", "w") as f:
-        f.write(guide_content)
+    Path("DEPLOYMENT.md").write_text(guide_content)
     
     print("✓ Deployment guide created")
 
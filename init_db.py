@@ -1,27 +1,30 @@
 """
 Database initialization script for Care-Sync Application
 """
-from database import create_tables, SessionLocal, User
+from database import create_tables, get_sessionmaker, User
 from utils import get_password_hash
 from config import UserRole
 from datetime import datetime
 
 def create_sample_users():
-    """Create sample users for testing"""
-    db = SessionLocal()
+    """Create sample users for testing; returns False if creation failed"""
+    db = get_sessionmaker()()
     
     try:
         # Check if users already exist
-        existing_users = db.query(User).count()
-        if existing_users > 0:
+        if db.query(User.id).limit(1).first() is not None:
             print("Users already exist in database. Skipping user creation.")
-            return
-        
+            return True
+
+        # bcrypt is deliberately slow; the demo accounts share one password,
+        # so hash it once
+        sample_password_hash = get_password_hash("password123")
+
         # Create sample patient
         patient = User(
             username="patient1",
             email="patient1@example.com",
-            hashed_password=get_password_hash("password123"),
+            hashed_password=sample_password_hash,
             role=UserRole.PATIENT,
             full_name="John Doe",
             phone="+1234567890",
@@ -34,7 +37,7 @@ def create_sample_users():
         doctor = User(
             username="doctor1",
             email="doctor1@example.com",
-            hashed_password=get_password_hash("password123"),
+            hashed_password=sample_password_hash,
             role=UserRole.DOCTOR,
             full_name="Dr. Jane Smith",
             phone="+1234567891",
@@ -47,7 +50,7 @@ def create_sample_users():
         admin = User(
             username="admin1",
             email="admin1@example.com",
-            hashed_password=get_password_hash("password123"),
+            hashed_password=sample_password_hash,
             role=UserRole.ADMIN,
             full_name="Admin User",
             phone="+1234567892",
@@ -57,9 +60,7 @@ def create_sample_users():
         )
         
         # Add users to database
-        db.add(patient)
-        db.add(doctor)
-        db.add(admin)
+        db.add_all([patient, doctor, admin])
         db.commit()
         
         print("Sample users created successfully!")
@@ -67,10 +68,12 @@ def create_sample_users():
         print("Patient: username='patient1', password='password123'")
         print("Doctor: username='doctor1', password='password123'")
         print("Admin: username='admin1', password='password123'")
-        
+        return True
+
     except Exception as e:
         print(f"Error creating sample users: {e}")
         db.rollback()
+        return False
     finally:
         db.close()
 
@@ -1,35 +1,57 @@
 """
 Startup script for Care-Sync Application
 """
+import hashlib
 import subprocess
 import sys
 import time
 import threading
 import os
+import urllib.request
+from importlib.util import find_spec
 from pathlib import Path
 
 def check_dependencies():
-    """Check if all dependencies are installed"""
-    try:
-        import streamlit
-        import fastapi
-        import sqlalchemy
-        print("✓ Dependencies check passed")
-        return True
-    except ImportError as e:
-        print(f"❌ Missing dependencies: {e}")
+    """Check if all dependencies are installed, without importing them"""
+    missing = [name for name in ("streamlit", "fastapi", "sqlalchemy") if find_spec(name) is None]
+    if missing:
+        print(f"❌ Missing dependencies: {', '.join(missing)}")
         print("Please run: pip install -r requirements.txt")
         return False
+    print("✓ Dependencies check passed")
+    return True
+
+# Records the schema the database was last initialized with
+INIT_SENTINEL = Path(".care_sync_init")
+
+def schema_fingerprint(metadata):
+    """Hash of every table and column name in the SQLAlchemy metadata"""
+    schema = sorted((table.name, tuple(sorted(table.columns.keys()))) for table in metadata.sorted_tables)
+    return hashlib.sha1(repr(schema).encode()).hexdigest()
 
 def initialize_database():
-    """Initialize the database"""
+    """Initialize the database, skipped when it already matches the schema"""
     print("Initializing database...")
     try:
+        from database import Base, get_engine
+
+        fingerprint = schema_fingerprint(Base.metadata)
+        database_file = Path(get_engine().url.database)
+        if (database_file.exists() and INIT_SENTINEL.exists()
+                and INIT_SENTINEL.read_text(errors="ignore") == fingerprint):
+            print("✓ Database already initialized")
+            return True
+
         from database import create_tables
         from init_db import create_sample_users
-        
+
         create_tables()
-        create_sample_users()
+        # The sentinel is only written once seeding succeeded, so a failed
+        # attempt is retried on the next boot
+        if not create_sample_users():
+            print("❌ Database initialization failed: sample users were not created")
+            return False
+        INIT_SENTINEL.write_text(fingerprint)
         print("✓ Database initialized")
         return True
     except Exception as e:
@@ -37,23 +59,35 @@ def initialize_database():
         return False
 
 def start_api_server():
-    """Start the FastAPI server"""
+    """Run the FastAPI server in this process (called on a background thread)"""
+    import uvicorn
+
     try:
         print("Starting API server on http://localhost:8000...")
-        subprocess.run([
-            sys.executable, "-m", "uvicorn", "api:app",
-            "--host", "0.0.0.0", "--port", "8000", "--reload"
-        ])
+        config = uvicorn.Config("api:app", host="0.0.0.0", port=8000, log_level="info")
+        uvicorn.Server(config).run()
     except KeyboardInterrupt:
         print("\nAPI server stopped")
     except Exception as e:
         print(f"❌ Failed to start API server: {e}")
 
+def wait_for_api(url="http://127.0.0.1:8000/health", timeout=10.0):
+    """Poll the API health endpoint until it answers or the timeout passes"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=0.2)
+            return True
+        except Exception:
+            time.sleep(0.05)
+    return False
+
 def start_streamlit_app():
     """Start the Streamlit application"""
     try:
         print("Starting Streamlit app on http://localhost:8501...")
-        time.sleep(3)  # Wait for API server to start
+        if not wait_for_api():
+            print("⚠️  API server is not responding yet; starting Streamlit anyway")
         subprocess.run([
             sys.executable, "-m", "streamlit", "run", "app.py",
             "--server.port", "8501"
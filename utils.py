@@ -3,40 +3,110 @@ Utility functions for Care-Sync Application
 """
 import os
 import hashlib
-import json
+import hmac
+import struct
+import threading
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import islice
 from typing import Optional, Dict, Any
+from cachetools import TTLCache
 from cryptography.fernet import Fernet
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+import bcrypt
+import jwt
 # import magic  # Optional dependency
-import PyPDF2
-from PIL import Image
-import pandas as pd
-from config import SECRET_KEY, ALGORITHM, ENCRYPTION_KEY, CRITICAL_VALUES
+# PyPDF2 and PIL are imported inside the upload helpers that use them, so
+# importing utils (init_db, API startup) doesn't pay for them up front
+import numpy as np
+from config import (
+    SECRET_KEY, ALGORITHM, BCRYPT_ROUNDS, ENCRYPTION_KEY, DEV_ENCRYPTION_KEY_FILE, CRITICAL_VALUES,
+    PASSWORD_CACHE_TTL, USE_VERIFY_PASSWORD_CACHE
+)
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing uses bcrypt directly; bcrypt only reads the first 72
+# bytes, so longer passwords are truncated as passlib did
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+def _bcrypt_secret(password: str) -> bytes:
+    return password.encode()[:BCRYPT_MAX_PASSWORD_BYTES]
+
+# Successful password verifications, keyed by an HMAC of the credentials
+_pw_cache = TTLCache(maxsize=2048, ttl=PASSWORD_CACHE_TTL)
+_pw_cache_lock = threading.Lock()
 
 # Encryption setup
+@lru_cache(maxsize=1)
 def get_encryption_key():
-    """Get or generate encryption key"""
+    """Get the configured encryption key, or the persisted development key.
+
+    The development key is generated once and kept on disk, so files
+    encrypted before a restart (or by another worker) stay readable.
+    """
     if ENCRYPTION_KEY and ENCRYPTION_KEY != "your-encryption-key-change-in-production":
         return ENCRYPTION_KEY.encode()
-    else:
-        # Generate a new key for development
-        return Fernet.generate_key()
 
-fernet = Fernet(get_encryption_key())
+    try:
+        # O_EXCL so a concurrent first start never overwrites an existing key
+        fd = os.open(DEV_ENCRYPTION_KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return DEV_ENCRYPTION_KEY_FILE.read_bytes().strip()
+    key = Fernet.generate_key()
+    with os.fdopen(fd, "wb") as key_file:
+        key_file.write(key)
+    return key
+
+@lru_cache(maxsize=1)
+def get_fernet() -> Fernet:
+    """Fernet cipher for field data and legacy whole-file tokens"""
+    return Fernet(get_encryption_key())
+
+# Files are stream-encrypted with AES-GCM in fixed-size frames. Each frame's
+# index and last-frame flag are authenticated, so frames can't be reordered,
+# dropped or truncated unnoticed. Files without the header are legacy Fernet.
+FILE_MAGIC = b"CSAG\x01"
+FILE_FRAME_SIZE = 1 << 20
+_FRAME_HEADER = struct.Struct(">I?")  # ciphertext length, last-frame flag
+_NONCE_SIZE = 12
+
+def _frame_aad(index: int, last: bool) -> bytes:
+    return FILE_MAGIC + struct.pack(">Q?", index, last)
+
+@lru_cache(maxsize=1)
+def get_file_aead() -> AESGCM:
+    """AES-GCM cipher for file frames, keyed from the same secret as Fernet"""
+    return AESGCM(hashlib.sha256(get_encryption_key()).digest())
 
 # Password utilities
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return bcrypt.checkpw(_bcrypt_secret(plain_password), hashed_password.encode())
+
+def verify_password_cached(username: str, plain_password: str, hashed_password: str) -> bool:
+    """Verify a password, reusing recent successful verifications when enabled"""
+    if not USE_VERIFY_PASSWORD_CACHE:
+        return verify_password(plain_password, hashed_password)
+
+    # The stored hash is part of the key so a password change invalidates it
+    message = "\0".join((username, plain_password, hashed_password)).encode()
+    key = hmac.new(SECRET_KEY.encode(), message, hashlib.sha256).digest()
+
+    with _pw_cache_lock:
+        if key in _pw_cache:
+            return True
+
+    verified = verify_password(plain_password, hashed_password)
+
+    # Failed attempts are never cached so lockout semantics are preserved
+    if verified:
+        with _pw_cache_lock:
+            _pw_cache[key] = True
+
+    return verified
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
-    return pwd_context.hash(password)
+    return bcrypt.hashpw(_bcrypt_secret(password), bcrypt.gensalt(BCRYPT_ROUNDS)).decode()
 
 # JWT token utilities
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -55,28 +125,39 @@ def verify_token(token: str) -> Optional[Dict[str, Any]]:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
-    except JWTError:
+    except jwt.InvalidTokenError:
         return None
 
 # Encryption utilities
 def encrypt_data(data: str) -> str:
     """Encrypt sensitive data"""
-    return fernet.encrypt(data.encode()).decode()
+    return get_fernet().encrypt(data.encode()).decode()
 
 def decrypt_data(encrypted_data: str) -> str:
     """Decrypt sensitive data"""
-    return fernet.decrypt(encrypted_data.encode()).decode()
+    return get_fernet().decrypt(encrypted_data.encode()).decode()
 
 def encrypt_file(file_path: str) -> str:
-    """Encrypt a file and return encrypted file path"""
-    with open(file_path, 'rb') as file:
-        file_data = file.read()
-
-    encrypted_data = fernet.encrypt(file_data)
+    """Encrypt a file frame by frame and return encrypted file path"""
     encrypted_path = f"{file_path}.encrypted"
-
-    with open(encrypted_path, 'wb') as encrypted_file:
-        encrypted_file.write(encrypted_data)
+    aead = get_file_aead()
+
+    with open(file_path, 'rb') as file, open(encrypted_path, 'wb') as encrypted_file:
+        encrypted_file.write(FILE_MAGIC)
+        index = 0
+        chunk = file.read(FILE_FRAME_SIZE)
+        while True:
+            # Read one frame ahead so the final frame can be flagged
+            next_chunk = file.read(FILE_FRAME_SIZE)
+            last = not next_chunk
+            nonce = os.urandom(_NONCE_SIZE)
+            ciphertext = aead.encrypt(nonce, chunk, _frame_aad(index, last))
+            encrypted_file.write(_FRAME_HEADER.pack(len(ciphertext), last))
+            encrypted_file.write(nonce)
+            encrypted_file.write(ciphertext)
+            if last:
+                break
+            chunk, index = next_chunk, index + 1
 
     # Remove original file
     os.remove(file_path)
@@ -85,58 +166,83 @@ def encrypt_file(file_path: str) -> str:
 def decrypt_file(encrypted_path: str, output_path: str) -> str:
     """Decrypt a file and save to output path"""
     with open(encrypted_path, 'rb') as encrypted_file:
-        encrypted_data = encrypted_file.read()
-
-    decrypted_data = fernet.decrypt(encrypted_data)
-
-    with open(output_path, 'wb') as output_file:
-        output_file.write(decrypted_data)
+        if encrypted_file.read(len(FILE_MAGIC)) != FILE_MAGIC:
+            # Legacy whole-file Fernet token
+            encrypted_file.seek(0)
+            with open(output_path, 'wb') as output_file:
+                output_file.write(get_fernet().decrypt(encrypted_file.read()))
+            return output_path
+
+        aead = get_file_aead()
+        with open(output_path, 'wb') as output_file:
+            index = 0
+            while True:
+                header = encrypted_file.read(_FRAME_HEADER.size)
+                if len(header) < _FRAME_HEADER.size:
+                    raise ValueError("Encrypted file is truncated")
+                length, last = _FRAME_HEADER.unpack(header)
+                nonce = encrypted_file.read(_NONCE_SIZE)
+                ciphertext = encrypted_file.read(length)
+                output_file.write(aead.decrypt(nonce, ciphertext, _frame_aad(index, last)))
+                if last:
+                    break
+                index += 1
 
     return output_path
 
 # File processing utilities
+MIME_TYPES_BY_EXTENSION = {
+    '.pdf': 'application/pdf',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.txt': 'text/plain',
+    '.doc': 'application/msword',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+}
+
 def get_file_type(file_path: str) -> str:
     """Get file MIME type"""
     # Extension-based detection (fallback when python-magic is not available)
     ext = os.path.splitext(file_path)[1].lower()
-    mime_types = {
-        '.pdf': 'application/pdf',
-        '.jpg': 'image/jpeg',
-        '.jpeg': 'image/jpeg',
-        '.png': 'image/png',
-        '.txt': 'text/plain',
-        '.doc': 'application/msword',
-        '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-    }
-    return mime_types.get(ext, 'application/octet-stream')
+    return MIME_TYPES_BY_EXTENSION.get(ext, 'application/octet-stream')
+
+def extract_text_from_pdf(file_path: str, max_pages: Optional[int] = None) -> str:
+    """Extract text from PDF file, from at most ``max_pages`` pages if given"""
+    import PyPDF2
 
-def extract_text_from_pdf(file_path: str) -> str:
-    """Extract text from PDF file"""
     try:
         with open(file_path, 'rb') as file:
             pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text()
-            return text
+            pages = islice(pdf_reader.pages, max_pages)
+            return "".join(page.extract_text() or "" for page in pages)
     except Exception as e:
         return f"Error extracting text: {str(e)}"
 
-def extract_metadata_from_file(file_path: str) -> Dict[str, Any]:
-    """Extract metadata from uploaded file"""
+def extract_metadata_from_file(file_path: str, checksum: Optional[str] = None,
+                               extract_text: bool = False,
+                               file_size: Optional[int] = None) -> Dict[str, Any]:
+    """Extract metadata from uploaded file, reusing a precomputed checksum and size if given
+
+    PDF text extraction is slow and nothing on the upload path reads it, so
+    it only runs when ``extract_text`` is set.
+    """
     metadata = {
-        "file_size": os.path.getsize(file_path),
+        "file_size": os.path.getsize(file_path) if file_size is None else file_size,
         "file_type": get_file_type(file_path),
         "upload_time": datetime.now(timezone.utc).isoformat(),
-        "checksum": calculate_file_checksum(file_path)
+        "checksum": checksum or calculate_file_checksum(file_path)
     }
 
     # Extract additional metadata based on file type
     file_type = metadata["file_type"]
 
     if file_type == "application/pdf":
-        metadata["extracted_text"] = extract_text_from_pdf(file_path)
+        if extract_text:
+            metadata["extracted_text"] = extract_text_from_pdf(file_path)
     elif file_type.startswith("image/"):
+        from PIL import Image
+
         try:
             with Image.open(file_path) as img:
                 metadata["image_dimensions"] = img.size
@@ -147,85 +253,122 @@ def extract_metadata_from_file(file_path: str) -> Dict[str, Any]:
     return metadata
 
 def calculate_file_checksum(file_path: str) -> str:
-    """Calculate SHA256 checksum of file"""
-    sha256_hash = hashlib.sha256()
+    """Calculate SHA256 checksum of file, hashing it in C rather than per chunk"""
     with open(file_path, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
-    return sha256_hash.hexdigest()
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+
+            return hashlib.file_digest(f, "sha256").hexdigest()
+
+        # Older Pythons: hash a read-only mapping of the whole file in one call
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha256().hexdigest()  # empty files can't be mapped
+        import mmap
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, "madvise"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            return hashlib.sha256(mm).hexdigest()
 
 # Health data analysis utilities
-def analyze_health_metrics(metrics_data: list) -> Dict[str, Any]:
-    """Analyze health metrics and detect trends"""
-    if not metrics_data:
-        return {}
+def analyze_health_metrics(names: np.ndarray, values: np.ndarray) -> Dict[str, Any]:
+    """Analyze health metrics and detect trends
 
-    df = pd.DataFrame(metrics_data)
-    analysis = {}
+    Expects parallel arrays sorted by metric name, then by recorded time.
+    """
+    if not len(values):
+        return {}
 
-    for metric_name in df['metric_name'].unique():
-        metric_df = df[df['metric_name'] == metric_name].sort_values('recorded_at')
+    # Start offset of each metric's run of values
+    starts = np.flatnonzero(np.r_[True, names[1:] != names[:-1]])
+    ends = np.r_[starts[1:], len(values)]
+
+    # Per-run aggregates in one pass each instead of per-metric Python calls
+    first, latest = values[starts], values[ends - 1]
+    averages = np.add.reduceat(values, starts) / (ends - starts)
+    minimums = np.minimum.reduceat(values, starts)
+    maximums = np.maximum.reduceat(values, starts)
+    trends = np.select(
+        [ends - starts < 2, latest > first, latest < first],
+        ["insufficient_data", "increasing", "decreasing"],
+        default="stable"
+    )
 
+    analysis = {}
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        metric_name = str(names[start])
         analysis[metric_name] = {
-            "latest_value": metric_df.iloc[-1]['value'] if not metric_df.empty else None,
-            "average": metric_df['value'].mean(),
-            "min": metric_df['value'].min(),
-            "max": metric_df['value'].max(),
-            "trend": calculate_trend(metric_df['value'].tolist()),
-            "critical_alerts": check_critical_values(metric_name, metric_df['value'].tolist())
+            "latest_value": float(latest[i]),
+            "average": float(averages[i]),
+            "min": float(minimums[i]),
+            "max": float(maximums[i]),
+            "trend": str(trends[i]),
+            "critical_alerts": check_critical_values(metric_name, values[start:end])
         }
 
     return analysis
 
-def calculate_trend(values: list) -> str:
-    """Calculate trend direction for a series of values"""
-    if len(values) < 2:
-        return "insufficient_data"
-
-    # Simple trend calculation using first and last values
-    if values[-1] > values[0]:
-        return "increasing"
-    elif values[-1] < values[0]:
-        return "decreasing"
-    else:
-        return "stable"
-
-def check_critical_values(metric_name: str, values: list) -> list:
+def check_critical_values(metric_name: str, values: np.ndarray) -> list:
     """Check for critical health values"""
-    alerts = []
+    if metric_name not in CRITICAL_VALUES:
+        return []
+
+    thresholds = CRITICAL_VALUES[metric_name]
+    low, high = thresholds["min"], thresholds["max"]
+    flagged = values[(values < low) | (values > high)]
+    critical = (flagged < low * 0.8) | (flagged > high * 1.2)
+
+    return [
+        {
+            "value": value,
+            "threshold": thresholds,
+            "severity": "critical" if is_critical else "warning"
+        }
+        for value, is_critical in zip(flagged.tolist(), critical.tolist())
+    ]
+
+# CRITICAL_VALUES as sorted parallel arrays for vectorized threshold lookups
+_THRESHOLD_NAMES = np.array(sorted(CRITICAL_VALUES))
+_THRESHOLD_MINS = np.array([CRITICAL_VALUES[name]["min"] for name in _THRESHOLD_NAMES], dtype=float)
+_THRESHOLD_MAXS = np.array([CRITICAL_VALUES[name]["max"] for name in _THRESHOLD_NAMES], dtype=float)
 
-    if metric_name in CRITICAL_VALUES:
-        thresholds = CRITICAL_VALUES[metric_name]
-        for value in values:
-            if value < thresholds["min"] or value > thresholds["max"]:
-                alerts.append({
-                    "value": value,
-                    "threshold": thresholds,
-                    "severity": "critical" if value < thresholds["min"] * 0.8 or value > thresholds["max"] * 1.2 else "warning"
-                })
+def flag_critical_values(names: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Boolean mask of readings outside their metric's normal range.
 
-    return alerts
+    Metrics without configured thresholds are never flagged.
+    """
+    names = np.asarray(names, dtype=str)
+    values = np.asarray(values, dtype=float)
+    idx = np.minimum(np.searchsorted(_THRESHOLD_NAMES, names), len(_THRESHOLD_NAMES) - 1)
+    known = _THRESHOLD_NAMES[idx] == names
+    return known & ((values < _THRESHOLD_MINS[idx]) | (values > _THRESHOLD_MAXS[idx]))
 
 # Validation utilities
-def validate_file_upload(file_path: str, max_size: int) -> Dict[str, Any]:
-    """Validate uploaded file"""
+ALLOWED_FILE_TYPES = frozenset({
+    'application/pdf', 'image/jpeg', 'image/png', 'text/plain',
+    'application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+})
+
+def file_type_error(file_name: str) -> Optional[str]:
+    """Error message for a disallowed file type, judged from the name alone"""
+    file_type = get_file_type(file_name)
+    if file_type not in ALLOWED_FILE_TYPES:
+        return f"File type ({file_type}) is not allowed"
+    return None
+
+def validate_file_upload(file_path: str, max_size: int, file_size: Optional[int] = None) -> Dict[str, Any]:
+    """Validate uploaded file, reusing a precomputed size if given"""
     result = {"valid": True, "errors": []}
 
     # Check file size
-    file_size = os.path.getsize(file_path)
+    if file_size is None:
+        file_size = os.path.getsize(file_path)
     if file_size > max_size:
         result["valid"] = False
-        result["errors"].append(f"File size ({file_size} bytes) exceeds maximum allowed size ({max_size} bytes)")
+        # Oversized uploads stop streaming early, so file_size is only a lower bound
+        result["errors"].append(f"File exceeds maximum of {max_size} bytes")
 
     # Check file type
-    file_type = get_file_type(file_path)
-    allowed_types = [
-        'application/pdf', 'image/jpeg', 'image/png', 'text/plain',
-        'application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-    ]
-
-    if file_type not in allowed_types:
+    type_error = file_type_error(file_path)
+    if type_error:
         result["valid"] = False
-        result["errors"].append(f"File type ({file_type}) is not allowed")
+        result["errors"].append(type_error)
 
     return result